@@ -0,0 +1,72 @@
+"""Benchmark the decoding of the airport list against the former json.loads.
+
+An unchanged feed costs only the SHA-1 digest of its body. The parsing
+of a changed feed, in the chunks it is read in, is measured with the one
+site of a single entry decoded and every site.
+
+Run with: python benchmarks/bench_decode.py
+"""
+import hashlib
+import json
+import tracemalloc
+from types import SimpleNamespace
+
+from common import best_of, chunked, load_corpus, report
+
+from custom_components.aoaws_anws.data import AnwsAoawsFeed, AnwsAoawseData
+from custom_components.aoaws_anws.decoder import _decoder, backend, decode_feed
+
+
+def peak_memory(func):
+    """Return the peak memory allocated by a call of func in bytes."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def pipeline(decode, body):
+    """Return a function decoding, indexing and converting every site of a feed."""
+    feed = SimpleNamespace(data=None)
+    sites = []
+
+    def run():
+        feed.data = AnwsAoawsFeed._index(decode(body)["airport_list"]["Taiwan"])
+        if not sites:
+            sites.extend(
+                AnwsAoawseData(None, location, "en", feed) for location in feed.data
+            )
+            for site_data in sites:
+                site_data.site_name = site_data._site
+        return [site_data.build_snapshot() for site_data in sites]
+
+    return run
+
+
+def main():
+    decoders = [("json", json.loads)]
+    if _decoder() is not json.loads:
+        decoders.append(("orjson", _decoder()))
+
+    print(f"decode_feed uses {backend()}")
+    for name, body in load_corpus().items():
+        rows = [(f"decode with {label}", best_of(lambda: decode(body), 200)) for label, decode in decoders]
+        rows.append(("decode_feed", best_of(lambda: decode_feed(body), 200)))
+        one_site = {json.loads(body)["airport_list"]["Taiwan"][0][0]["location_en"]}
+        rows.append(("SHA-1 digest, unchanged feed", best_of(lambda: hashlib.sha1(body).digest(), 200)))
+        decodes = [
+            ("parse and index, every site", lambda: AnwsAoawsFeed._decode(chunked(body), None)),
+            ("parse and index, one site", lambda: AnwsAoawsFeed._decode(chunked(body), one_site)),
+        ]
+        rows += [(label, best_of(decode, 200)) for label, decode in decodes]
+        rows.append(("json.loads, index and convert", best_of(pipeline(json.loads, body), 20)))
+        rows.append(("decode_feed, index and convert", best_of(pipeline(decode_feed, body), 20)))
+        report(f"{name} ({len(body)} bytes)", rows)
+        memory = [("decode_feed", lambda: decode_feed(body)), *decodes]
+        for label, func in memory:
+            print(f"  peak memory, {label}: {peak_memory(func)} bytes")
+
+
+if __name__ == "__main__":
+    main()
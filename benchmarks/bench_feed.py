@@ -0,0 +1,251 @@
+"""Benchmark the feed from the HTTP request down to the entity states.
+
+A Home Assistant core is started in a temporary config directory with
+the integration linked in, and the feed is served by the local stand-in
+of server.py, for every recorded feed of the corpus.
+
+Reported are:
+- the fetch latency, of a full and of a not modified response
+- the time to index a parsed feed
+- the time to convert the observations of one site
+- the bytes of a feed, decompressed and on the wire with and without
+  compression
+- the memory and the entity state writes per poll for 1, 17 and 100 entries,
+  the memory of the first entry includes setting up the platforms
+
+Run with: python benchmarks/bench_feed.py
+"""
+import asyncio
+import calendar
+import copy
+import functools
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from common import best_of, chunked, load_corpus, report
+
+from server import FeedServer
+
+from homeassistant import bootstrap, config_entries, loader
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CoreState, HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+import custom_components.aoaws_anws as integration
+from custom_components.aoaws_anws.const import (
+    ANWS_AOAWS_COORDINATOR,
+    ANWS_AOAWS_FEED,
+    CONF_LANGUAGE,
+    CONF_LOCATION_NAME,
+    DOMAIN,
+)
+from custom_components.aoaws_anws.data import AnwsAoawsFeed, AnwsAoawseData
+
+ENTRY_COUNTS = (1, 17, 100)
+FETCHES = 50
+
+
+def scaled_feed(body, count):
+    """Return a feed of count sites, cloning the sites of a recorded feed."""
+    groups = [group for group in json.loads(body)["airport_list"]["Taiwan"] if group]
+    scaled = []
+    for index in range(count):
+        group = copy.deepcopy(groups[index % len(groups)])
+        for record in group:
+            if index >= len(groups):
+                record["location_en"] = f"{record['location_en']} {index}"
+        scaled.append(group)
+    return {"airport_list": {"Taiwan": scaled}}
+
+
+def sites_of(feed):
+    """Return the locations of a feed."""
+    return [group[0]["location_en"] for group in feed["airport_list"]["Taiwan"]]
+
+
+def advanced_feed(feed, count):
+    """Return the feed with a new, warmer observation for the first count sites."""
+    feed = copy.deepcopy(feed)
+    for group in feed["airport_list"]["Taiwan"][:count]:
+        record = copy.deepcopy(max(group, key=lambda j: j["datatime"]))
+        stamp = time.strptime(record["datatime"], "%Y-%m-%dT%H:%M:%SZ")
+        record["datatime"] = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(calendar.timegm(stamp) + 1800)
+        )
+        record["TEMP"] = str(int(record.get("TEMP", "0")) + 1)
+        group.append(record)
+    return feed
+
+
+def encode(feed):
+    """Return the body of a feed."""
+    return json.dumps(feed, ensure_ascii=False).encode()
+
+
+async def async_start_hass(config_dir):
+    """Start a Home Assistant core with the integration as custom integration."""
+    os.symlink(
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_components"),
+        os.path.join(config_dir, "custom_components"),
+    )
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.set_state(CoreState.running)
+    return hass
+
+
+async def async_fetch_and_parse(hass, server, name, body):
+    """Return the fetch, parse and conversion timings of a feed."""
+    server.body = body
+    session = async_get_clientsession(hass)
+    feed = AnwsAoawsFeed(hass, uri=server.url, session=session)
+
+    full, not_modified = [], []
+    for _ in range(FETCHES):
+        feed.data = None
+        start = time.perf_counter()
+        fetched = await feed._async_fetch()
+        full.append(time.perf_counter() - start)
+        feed.data = {}
+        start = time.perf_counter()
+        await feed._async_fetch()
+        not_modified.append(time.perf_counter() - start)
+
+    parse = best_of(lambda: feed._decode(chunked(body), None), 20)
+    feed._async_set_feed(fetched.feed, feed._convert(fetched.feed.data, [], {}))
+
+    sites = [
+        AnwsAoawseData(hass, location, "en", feed) for location in feed.locations
+    ]
+    for site_data in sites:
+        site_data._update_site()
+    convert = best_of(
+        lambda: [site_data.build_snapshot() for site_data in sites], 20
+    ) / max(len(sites), 1)
+
+    return [
+        (f"{name}: fetch, full response", statistics.median(full) * 1e6),
+        (f"{name}: fetch, not modified", statistics.median(not_modified) * 1e6),
+        (f"{name}: parse and index the feed", parse),
+        (f"{name}: convert one site", convert),
+    ]
+
+
+async def async_transfer(hass, server, name, body):
+    """Return the bytes of a feed, decompressed and on the wire."""
+    server.body = body
+    feed = AnwsAoawsFeed(hass, uri=server.url, session=async_get_clientsession(hass))
+    rows = []
+    for compress in (False, True):
+        server.compress = compress
+        fetched = await feed._async_fetch()
+        rows.append(
+            (
+                f"{name}: bytes on the wire, {'compressed' if compress else 'plain'}",
+                feed.transferred,
+            )
+        )
+    server.compress = False
+    rows.insert(0, (f"{name}: bytes decompressed", fetched.size))
+    return rows
+
+
+async def async_entries(hass, server, body, count):
+    """Return the memory per entry and the state writes per poll of count entries."""
+    feed = scaled_feed(body, max(count, 17))
+    server.body = encode(feed)
+    sites = sites_of(feed)[:count]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for location in sites:
+        entry = config_entries.ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=location,
+            data={CONF_LOCATION_NAME: location, CONF_LANGUAGE: "en"},
+            source=config_entries.SOURCE_USER,
+            options={},
+            unique_id=location,
+        )
+        await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    memory = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    writes = []
+    remove_listener = hass.bus.async_listen(EVENT_STATE_CHANGED, writes.append)
+    coordinator = hass.data[DOMAIN][ANWS_AOAWS_FEED][ANWS_AOAWS_COORDINATOR]
+
+    async def async_poll(new_body=None):
+        if new_body is not None:
+            server.body = new_body
+        writes.clear()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        return len(writes)
+
+    rows = [(f"{count} entries: memory per entry (bytes)", memory / count)]
+    rows.append((f"{count} entries: writes, not modified poll", await async_poll()))
+    feed = advanced_feed(feed, 1)
+    rows.append((f"{count} entries: writes, one site changed", await async_poll(encode(feed))))
+    feed = advanced_feed(feed, len(feed["airport_list"]["Taiwan"]))
+    rows.append((f"{count} entries: writes, all sites changed", await async_poll(encode(feed))))
+
+    remove_listener()
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    return rows
+
+
+def print_counts(title, rows):
+    """Print rows of counts and sizes."""
+    print(title)
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"  {name:<{width}}  {value:>12.1f}")
+
+
+async def async_main():
+    logging.basicConfig(level=logging.CRITICAL)
+    corpus = load_corpus()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        server = FeedServer(corpus["normal"])
+        await server.start()
+        # Point the shared feed of the entries at the stand-in
+        integration.AnwsAoawsFeed = functools.partial(AnwsAoawsFeed, uri=server.url)
+
+        timings = []
+        for name, body in corpus.items():
+            timings += await async_fetch_and_parse(hass, server, name, body)
+        report("Fetch, decode and conversion", timings)
+
+        transfer = []
+        for name, body in corpus.items():
+            transfer += await async_transfer(hass, server, name, body)
+        print_counts("Transfer", transfer)
+
+        counts = []
+        for count in ENTRY_COUNTS:
+            counts += await async_entries(hass, server, corpus["normal"], count)
+        print_counts("Entries", counts)
+
+        await server.stop()
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
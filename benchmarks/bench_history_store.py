@@ -0,0 +1,149 @@
+"""Benchmark the memory-mapped history store against a recorder query.
+
+A year of half-hourly observations of one site is written both to a
+SiteHistoryStore and to a SQLite table shaped like the recorder states
+table, then the temperatures of one week are read back from each.
+
+The script fails with an AssertionError when the store reads back other
+values than the recorder, or does not recover from a record written only
+partly.
+
+Run with: python benchmarks/bench_history_store.py
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from common import best_of, report
+
+from custom_components.aoaws_anws.history_store import (
+    FIELD_SCALES,
+    MISSING,
+    SiteHistoryStore,
+)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+COUNT = 365 * 48
+WEEK = (START + timedelta(days=180), START + timedelta(days=187))
+
+
+def observations():
+    """Return a year of synthetic observations."""
+    element = SimpleNamespace
+    return [
+        SimpleNamespace(
+            date=START + timedelta(minutes=30 * index),
+            temperature=element(value=20 + index % 10),
+            dew_point=element(value=15 + index % 5),
+            pressure=element(value=1010 + index % 7),
+            visibility=element(value=9.999),
+            wind_direction=element(value=index * 10 % 360),
+            wind_speed=element(value=index % 30 * 1.85),
+            wind_gust=None,
+        )
+        for index in range(COUNT)
+    ]
+
+
+def recorder(path, items):
+    """Return a connection to a recorder-like states table with the temperatures."""
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE states (state_id INTEGER PRIMARY KEY, metadata_id INTEGER,"
+        " state VARCHAR(255), last_updated_ts FLOAT)"
+    )
+    connection.execute(
+        "CREATE INDEX ix_states_metadata_id_last_updated_ts"
+        " ON states (metadata_id, last_updated_ts)"
+    )
+    connection.executemany(
+        "INSERT INTO states (metadata_id, state, last_updated_ts) VALUES (?, ?, ?)",
+        [(1, str(item.temperature.value), item.date.timestamp()) for item in items],
+    )
+    connection.commit()
+    return connection
+
+
+def check_partial_record(directory, items):
+    """Check that appending after a partly written record keeps the records aligned."""
+    store = SiteHistoryStore(os.path.join(directory, "partial.bin"))
+    store.append(items[:2])
+    with open(store.path, "ab") as history_file:
+        history_file.write(b"\x01\x02\x03")
+    assert len(store) == 2, f"{len(store)} records after a partial record"
+    store.append(items[2:3])
+    temperatures = list(store.column("temperature"))
+    expected = [item.temperature.value * FIELD_SCALES["temperature"] for item in items[:3]]
+    assert temperatures == expected, f"{temperatures} read back instead of {expected}"
+    store.close()
+
+
+def main():
+    items = observations()
+    with tempfile.TemporaryDirectory() as directory:
+        store = SiteHistoryStore(os.path.join(directory, "site.bin"))
+        store.append(items)
+        connection = recorder(os.path.join(directory, "recorder.db"), items)
+
+        start, end = (moment.timestamp() for moment in WEEK)
+        scale = FIELD_SCALES["temperature"]
+
+        def query_recorder():
+            rows = connection.execute(
+                "SELECT state, last_updated_ts FROM states WHERE metadata_id = ?"
+                " AND last_updated_ts >= ? AND last_updated_ts <= ?"
+                " ORDER BY last_updated_ts",
+                (1, start, end),
+            ).fetchall()
+            return sum(float(state) for state, _ in rows) / len(rows)
+
+        def query_store():
+            column = store.column("temperature", *WEEK)
+            values = [value for value in column if value != MISSING]
+            return sum(values) / len(values) / scale
+
+        def scan_store():
+            return max(store.column("temperature"))
+
+        def scan_recorder():
+            return max(
+                float(state)
+                for state, in connection.execute(
+                    "SELECT state FROM states WHERE metadata_id = ?", (1,)
+                )
+            )
+
+        assert len(store) == COUNT, f"{len(store)} records stored of {COUNT}"
+        assert query_store() == query_recorder(), "The store and the recorder differ"
+        assert scan_store() / scale == scan_recorder(), "The store and the recorder differ"
+        check_partial_record(directory, items)
+
+        report(
+            f"One week of temperatures out of {COUNT} observations",
+            [
+                ("recorder states query", best_of(query_recorder, 200)),
+                ("history store column view", best_of(query_store, 200)),
+            ],
+        )
+        report(
+            "Maximum temperature of the whole year",
+            [
+                ("recorder states query", best_of(scan_recorder, 20)),
+                ("history store column view", best_of(scan_store, 20)),
+            ],
+        )
+        report(
+            "Compaction",
+            [("history store compact", best_of(store.compact, 5, repeat=3))],
+        )
+
+        assert store.compact() == COUNT, "Compaction lost records"
+        connection.close()
+        store.close()
+        print(f"  history file {os.path.getsize(store.path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark the import time of the integration.
+
+Every run imports the integration in a fresh interpreter with -X importtime,
+after the Home Assistant modules it shares with the core are imported, so
+only the cost added by the integration is counted.
+
+Run with: python benchmarks/bench_import.py
+"""
+import os
+import subprocess
+import sys
+
+from common import BENCHMARK_DIR
+
+PACKAGE = "custom_components.aoaws_anws"
+MODULES = ("", ".config_flow", ".sensor", ".weather")
+
+# Loaded by Home Assistant before any custom integration
+PRELOAD = (
+    "import aiohttp, voluptuous, homeassistant.core, homeassistant.config_entries,"
+    " homeassistant.helpers.update_coordinator, homeassistant.helpers.storage,"
+    " homeassistant.helpers.aiohttp_client, homeassistant.components.sensor,"
+    " homeassistant.components.weather"
+)
+
+
+def import_time(module=None):
+    """Return the self and cumulative import time of the modules in microseconds."""
+    code = PRELOAD if module is None else f"{PRELOAD}\nimport {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(BENCHMARK_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[12:]:
+            continue
+        own, cumulative, name = line[12:].split("|")
+        if own.strip().isdigit():
+            times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main(repeat=7):
+    preloaded = import_time().keys()
+    rows = []
+    for suffix in MODULES:
+        module = PACKAGE + suffix
+        runs = [import_time(module) for _ in range(repeat)]
+        loaded = sorted(runs[0].keys() - preloaded)
+        # The time of everything imported on top of the core modules
+        total = min(sum(run[name][0] for name in loaded if name in run) for run in runs)
+        rows.append((module, total, loaded))
+
+    print("Import time on top of the Home Assistant core modules")
+    width = max(len(module) for module, _, _ in rows)
+    for module, total, _ in rows:
+        print(f"  {module:<{width}}  {total:>12.2f} us")
+    print("Modules newly imported with all the platforms")
+    for name in sorted({name for _, _, loaded in rows for name in loaded}):
+        print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
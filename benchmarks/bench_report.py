@@ -0,0 +1,104 @@
+"""Benchmark the METAR REPORT parser against the former per-token loop.
+
+The parser caches the groups taking few values, e.g. the clouds, which
+are shared by the sites from one poll to the next. It is measured with
+the caches kept and cleared before each pass over the corpus. The former
+loop gives up at the first runway visual range, as in the typhoon feed.
+
+The script fails with an AssertionError when the parser reads the
+reports of CHECKS otherwise, or a report of the corpus differently once
+the caches are cleared.
+
+Run with: python benchmarks/bench_report.py
+"""
+import re
+
+from common import best_of, load_corpus, records, report
+
+from custom_components.aoaws_anws import report as report_module
+from custom_components.aoaws_anws.report import parse_report
+
+
+# Reports with the fields expected of them
+CHECKS = {
+    "METAR RCTP 180600Z 34006G20KT 5000 BR FEW012CB BKN025 22/17 Q1015 NOSIG=": {
+        "temperature": 22, "dew_point": 17, "qnh": 1015.0, "wind_gust": 20,
+        "visibility": 5000, "ceiling": 2500, "weather": ("BR",),
+    },
+    # Dew point and present weather not observed
+    "METAR RCFN 180600Z 02012KT 5000 -RA // BKN008 OVC020 25/// Q1007=": {
+        "temperature": 25, "dew_point": None, "qnh": 1007.0, "ceiling": 800,
+        "weather": ("-RA",),
+    },
+    "METAR XXXX 180600Z /////KT //// ///// Q////=": {
+        "temperature": None, "wind_speed": None, "visibility": None, "qnh": None,
+    },
+    "METAR RCKH 180600Z 07004KT 180V240 CAVOK M02/M05 A2992=": {
+        "temperature": -2, "dew_point": -5, "qnh": 1013.2, "cavok": True,
+        "wind_variable": (180, 240), "visibility": 9999,
+    },
+}
+
+
+def check(reports):
+    """Check the parser on CHECKS, and with the caches cleared on reports."""
+    for text, expected in CHECKS.items():
+        parsed = parse_report(text)._asdict()
+        wrong = {field: parsed[field] for field, value in expected.items() if parsed[field] != value}
+        assert not wrong, f"{text} parsed with {wrong}"
+    assert parse_cold(reports) == [parse_report(r) for r in reports], "The caches change the result"
+
+
+def legacy_parse(j):
+    """The former extraction of dew point and QNH in _convert_to_observation."""
+    temperature = int(j.get("TEMP", "0"))
+    dew_point = pressure = None
+    try:
+        for k in j.get("REPORT", "").split():
+            if re.search(r"\d+\/\d+", k) and temperature == int(k.split("/")[0]):
+                dew_point = k.split("/", 1)[1]
+            if len(k) >= 1 and "Q" == k[0]:
+                pressure = k[1:]
+    except ValueError:
+        # The former loop failed on runway visual ranges like R05/0600
+        return None, None
+    return dew_point, pressure
+
+
+def parse_cold(reports):
+    """Parse reports with the caches of the groups cleared first."""
+    for cached in (report_module._clouds, report_module._weather, report_module._runway_ranges):
+        cached.cache_clear()
+    return [parse_report(r) for r in reports]
+
+
+def compare(title, corpus):
+    """Report the time of both parsers on the records of corpus."""
+    reports = [j.get("REPORT", "") for j in corpus]
+    rows = [
+        (
+            "per-token regex loop (dew point, QNH)",
+            best_of(lambda: [legacy_parse(j) for j in corpus], 50),
+        ),
+        (
+            "compiled single pass (all fields)",
+            best_of(lambda: [parse_report(r) for r in reports], 50),
+        ),
+        (
+            "compiled single pass, caches cleared",
+            best_of(lambda: parse_cold(reports), 50),
+        ),
+    ]
+    report(f"{title}, {len(reports)} reports, time per corpus", rows)
+
+
+def main():
+    feeds = {name: records(body) for name, body in load_corpus().items()}
+    check([j.get("REPORT", "") for corpus in feeds.values() for j in corpus])
+    compare("Whole corpus", [j for corpus in feeds.values() for j in corpus])
+    for name, corpus in feeds.items():
+        compare(name, corpus)
+
+
+if __name__ == "__main__":
+    main()
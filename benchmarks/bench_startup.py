@@ -0,0 +1,261 @@
+"""Check how the requests of the integration are spread out in time.
+
+A Home Assistant core is started with 17 entries set up at once, like at
+the start of Home Assistant, against the stand-in of server.py holding
+every response a while. Reported are:
+- the requests and the most requests in flight while setting up, without
+  and with a cached feed
+- the delay of the first live fetch after starting from the cached feed,
+  which waits up to half a minute
+- the most polls in one second of many installations waiting for the
+  same report, with the random poll phase and without it
+
+The script fails with an AssertionError when the requests are not spread
+as intended:
+- the entries set up at once make a single request
+- the entries set up from the cached feed make none
+- the first live fetches of repeated starts from the cache, with a spread
+  shortened to SPREAD_CHECK, fall within it and cover a good part of it
+- the random poll phase spreads the polls of the installations
+- the startup delays and the poll phases drawn fall within their spread
+  and cover it evenly
+
+The last two checks do not start Home Assistant, run only them with:
+python benchmarks/bench_startup.py --no-hass
+
+Run with: python benchmarks/bench_startup.py
+"""
+import asyncio
+import functools
+import logging
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from common import load_corpus
+
+from server import FeedServer
+from bench_feed import async_start_hass, print_counts, sites_of, scaled_feed
+
+from homeassistant import config_entries
+
+import custom_components.aoaws_anws as integration
+from custom_components.aoaws_anws.const import (
+    ANWS_AOAWS_DATA,
+    ANWS_AOAWS_FEED,
+    CONF_LANGUAGE,
+    CONF_LOCATION_NAME,
+    DOMAIN,
+    POLL_PHASE_SPREAD,
+    STARTUP_REFRESH_SPREAD,
+)
+from custom_components.aoaws_anws.data import AnwsAoawsFeed
+from custom_components.aoaws_anws.scheduler import IssuanceScheduler, random_delay
+
+ENTRIES = 17
+RESPONSE_DELAY = 0.2  # seconds
+INSTALLATIONS = 1000
+# The delays drawn to check their spread, and the parts of the spread
+DRAWS = 1000
+BINS = 10
+
+# The starts from the cache checked, with a shorter spread to keep it quick
+STARTS = 12
+SPREAD_CHECK = timedelta(seconds=2)
+# Allowance for the scheduling of the coordinator and the response delay
+SCHEDULING_MARGIN = 1.0  # seconds
+
+
+async def async_setup_entries(hass, server, locations):
+    """Set up an entry per location at once, return the requests meanwhile."""
+    server.requests = server.max_in_flight = 0
+    entries = []
+    for location in locations:
+        entry = config_entries.ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=location,
+            data={CONF_LOCATION_NAME: location, CONF_LANGUAGE: "en"},
+            source=config_entries.SOURCE_USER,
+            options={},
+            unique_id=location,
+        )
+        await hass.config_entries.async_add(entry)
+        entries.append(entry)
+    # async_add sets the entries up one by one, set them up again together
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    server.requests = server.max_in_flight = 0
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(hass.config_entries.async_setup(entry.entry_id) for entry in entries)
+    )
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    return server.requests, server.max_in_flight, elapsed
+
+
+async def async_first_request(server, start):
+    """Wait for the next request, return the seconds since start."""
+    deadline = time.monotonic() + integration.STARTUP_REFRESH_SPREAD.total_seconds() + 5
+    while not server.request_times and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if not server.request_times:
+        return float("nan")
+    return server.request_times[0] - start
+
+
+async def async_remove_entries(hass):
+    """Remove the entries of the integration."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def async_cached_start(hass, server, locations):
+    """Start from the cached feed, return the requests meanwhile and the first fetch."""
+    anws_aoaws_feed = hass.data[DOMAIN][ANWS_AOAWS_FEED][ANWS_AOAWS_DATA]
+    await anws_aoaws_feed._store.async_save(anws_aoaws_feed._data_to_store())
+    await async_remove_entries(hass)
+
+    server.request_times.clear()
+    start = time.perf_counter()
+    requests, _, elapsed = await async_setup_entries(hass, server, locations)
+    first_fetch = await async_first_request(server, start)
+    return requests, elapsed, first_fetch
+
+
+async def async_spread_of_starts(hass, server, locations):
+    """Return the first live fetch of repeated starts from the cache."""
+    spread = integration.STARTUP_REFRESH_SPREAD
+    integration.STARTUP_REFRESH_SPREAD = SPREAD_CHECK
+    try:
+        first_fetches = []
+        for _ in range(STARTS):
+            # A short delay may fetch while setting up, which is fine here
+            _, _, first_fetch = await async_cached_start(hass, server, locations)
+            first_fetches.append(first_fetch)
+    finally:
+        integration.STARTUP_REFRESH_SPREAD = spread
+    return first_fetches
+
+
+def check_spread(first_fetches):
+    """Check that the first fetches fall within the spread and cover it."""
+    spread = SPREAD_CHECK.total_seconds()
+    late = [delay for delay in first_fetches if not delay <= spread + SCHEDULING_MARGIN]
+    assert not late, f"First fetches after the spread of {spread} s: {late}"
+    covered = max(first_fetches) - min(first_fetches)
+    assert covered > spread / 4, (
+        f"First fetches of {STARTS} starts cover {covered:.2f} s of {spread} s: "
+        f"{sorted(first_fetches)}"
+    )
+
+
+def polls_per_second(phase):
+    """Return the most polls in one second of installations for the same report."""
+    routine = datetime(2024, 7, 1, 12, 0, tzinfo=timezone.utc)
+    seconds = Counter()
+    for _ in range(INSTALLATIONS):
+        scheduler = IssuanceScheduler(phase)
+        scheduler.observe("Taipei", [routine], False, False, routine)
+        now = routine + timedelta(minutes=29)
+        poll = now + scheduler.next_interval(now)
+        seconds[int(poll.timestamp())] += 1
+    return max(seconds.values())
+
+
+def check_delays(label, delays, spread):
+    """Check that delays fall within the spread and cover its parts evenly."""
+    outside = [delay for delay in delays if not timedelta() <= delay < spread]
+    assert not outside, f"{label} out of 0 to {spread}: {outside[:5]}"
+    bins = Counter(int(delay / spread * BINS) for delay in delays)
+    expected = len(delays) / BINS
+    uneven = {
+        part: bins[part]
+        for part in range(BINS)
+        if not expected / 2 < bins[part] < expected * 1.5
+    }
+    assert not uneven, f"{label} uneven over the tenths of {spread}: {uneven}"
+
+
+def check_random_delays():
+    """Check the startup delays and the poll phases, without Home Assistant."""
+    assert random_delay(STARTUP_REFRESH_SPREAD, lambda: 0.0) == timedelta()
+    assert random_delay(STARTUP_REFRESH_SPREAD, lambda: 0.5) == STARTUP_REFRESH_SPREAD / 2
+    delays = [random_delay(STARTUP_REFRESH_SPREAD) for _ in range(DRAWS)]
+    check_delays("Startup delays", delays, STARTUP_REFRESH_SPREAD)
+    phases = [IssuanceScheduler().phase for _ in range(DRAWS)]
+    check_delays("Poll phases", phases, POLL_PHASE_SPREAD)
+    return [
+        (f"{DRAWS} startup delays: earliest (s)", min(delays).total_seconds()),
+        (f"{DRAWS} startup delays: latest (s)", max(delays).total_seconds()),
+        (f"{DRAWS} poll phases: earliest (s)", min(phases).total_seconds()),
+        (f"{DRAWS} poll phases: latest (s)", max(phases).total_seconds()),
+    ]
+
+
+def check_polls():
+    """Check how the polls of many installations spread, without Home Assistant."""
+    with_phase = polls_per_second(None)
+    without_phase = polls_per_second(timedelta())
+    assert without_phase == INSTALLATIONS, f"{without_phase} polls in a second without phase"
+    # 30 s of phase, about 33 polls a second on average
+    assert with_phase < INSTALLATIONS / 10, f"{with_phase} polls in a second with the phase"
+    return [
+        (f"{INSTALLATIONS} installations: most polls in a second", with_phase),
+        (f"{INSTALLATIONS} installations without phase: most polls in a second", without_phase),
+    ]
+
+
+async def async_main(start_hass):
+    logging.basicConfig(level=logging.CRITICAL)
+    rows = check_random_delays() + check_polls()
+    if not start_hass:
+        print_counts("Startup and polling", rows)
+        return
+
+    corpus = load_corpus()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        feed = scaled_feed(corpus["normal"], ENTRIES)
+        server = FeedServer(corpus["normal"])
+        server.delay = RESPONSE_DELAY
+        await server.start()
+        integration.AnwsAoawsFeed = functools.partial(AnwsAoawsFeed, uri=server.url)
+        locations = sites_of(feed)[:ENTRIES]
+
+        requests, in_flight, elapsed = await async_setup_entries(hass, server, locations)
+        rows.append((f"{ENTRIES} entries: requests while setting up", requests))
+        rows.append((f"{ENTRIES} entries: most requests in flight", in_flight))
+        rows.append((f"{ENTRIES} entries: setup time (ms)", elapsed * 1000))
+        assert requests == 1, f"{requests} requests while setting up {ENTRIES} entries"
+        assert in_flight == 1, f"{in_flight} requests in flight at once"
+
+        requests, elapsed, first_fetch = await async_cached_start(hass, server, locations)
+        rows.append((f"{ENTRIES} cached entries: requests while setting up", requests))
+        rows.append((f"{ENTRIES} cached entries: setup time (ms)", elapsed * 1000))
+        rows.append((f"{ENTRIES} cached entries: first live fetch after (s)", first_fetch))
+        assert requests == 0, f"{requests} requests while setting up from the cache"
+        assert first_fetch <= STARTUP_REFRESH_SPREAD.total_seconds() + SCHEDULING_MARGIN, (
+            f"First live fetch after {first_fetch} s"
+        )
+
+        first_fetches = await async_spread_of_starts(hass, server, locations[:1])
+        rows.append((f"{STARTS} cached starts: earliest first fetch (s)", min(first_fetches)))
+        rows.append((f"{STARTS} cached starts: latest first fetch (s)", max(first_fetches)))
+        check_spread(first_fetches)
+        await async_remove_entries(hass)
+
+        await server.stop()
+        await hass.async_stop(force=True)
+
+    print_counts("Startup and polling", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main("--no-hass" not in sys.argv[1:]))
@@ -0,0 +1,52 @@
+"""Helpers shared by the ANWS AOAWS benchmarks."""
+import json
+import os
+import sys
+import timeit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, "corpus")
+
+# Make the integration importable as custom_components.aoaws_anws
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+
+def corpus_files():
+    """Return the paths of the recorded feeds."""
+    return sorted(
+        os.path.join(CORPUS_DIR, name)
+        for name in os.listdir(CORPUS_DIR)
+        if name.endswith(".json")
+    )
+
+
+def load_corpus():
+    """Return the recorded feeds as name and raw body."""
+    feeds = {}
+    for path in corpus_files():
+        with open(path, "rb") as corpus_file:
+            feeds[os.path.basename(path)[:-5]] = corpus_file.read()
+    return feeds
+
+
+def records(body):
+    """Return every record of a raw feed."""
+    return [j for i in json.loads(body)["airport_list"]["Taiwan"] for j in i]
+
+
+def chunked(body, size=16384):
+    """Return a body cut in the chunks it is read in, READ_CHUNK_SIZE."""
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+def best_of(func, number, repeat=5):
+    """Return the best time of one call of func in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def report(title, rows):
+    """Print the results of a benchmark as a table."""
+    print(title)
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"  {name:<{width}}  {value:>12.2f} us")
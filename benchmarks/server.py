@@ -0,0 +1,108 @@
+"""A local stand-in for the ANWS AOAWS get_metar_data endpoint.
+
+It answers the POST of the feed with a recorded body, with an ETag, so
+the conditional requests of the integration can be exercised too.
+
+Run with: python benchmarks/server.py [corpus name] [port]
+"""
+import asyncio
+import hashlib
+import sys
+import time
+
+from aiohttp import web
+
+from common import load_corpus
+
+PATH = "/Home/get_metar_data"
+
+
+class FeedServer:
+    """Serve a recorded feed on localhost."""
+
+    def __init__(self, body, port=0):
+        """Initialize the server with the body to serve."""
+        self.port = port
+        self.requests = 0
+        self.not_modified = 0
+        # The perf_counter times of the requests and the most in flight at once
+        self.request_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Seconds every response is held, like a slow ANWS AOAWS
+        self.delay = 0
+        # Compress the bodies as the Accept-Encoding of the request allows
+        self.compress = False
+        self._runner = None
+        self.body = body
+
+    @property
+    def body(self):
+        """Return the body served."""
+        return self._body
+
+    @body.setter
+    def body(self, body):
+        self._body = body
+        self._etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    @property
+    def url(self):
+        """Return the URL to use in place of BASE_URL."""
+        return f"http://127.0.0.1:{self.port}{PATH}"
+
+    async def _handle(self, request):
+        self.requests += 1
+        self.request_times.append(time.perf_counter())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return self._respond(request)
+        finally:
+            self.in_flight -= 1
+
+    def _respond(self, request):
+        if request.headers.get("If-None-Match") == self._etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": self._etag})
+        response = web.Response(
+            body=self._body,
+            content_type="application/json",
+            headers={"ETag": self._etag},
+        )
+        if self.compress:
+            response.enable_compression()
+        return response
+
+    async def start(self):
+        """Start listening, on a free port unless one was given."""
+        app = web.Application()
+        app.router.add_post(PATH, self._handle)
+        app.router.add_get(PATH, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop the server."""
+        await self._runner.cleanup()
+
+
+async def serve(name, port):
+    server = FeedServer(load_corpus()[name], port)
+    await server.start()
+    print(f"Serving {name} on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        serve(
+            sys.argv[1] if len(sys.argv) > 1 else "normal",
+            int(sys.argv[2]) if len(sys.argv) > 2 else 8124,
+        )
+    )
@@ -1,27 +1,44 @@
 """The Taiwan ANWS integration."""
 import asyncio
 import logging
+from functools import partial
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_API_KEY, CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 
 from .const import (
+    ALL_SITES,
+    CONF_HISTORY_STORE,
     CONF_LANGUAGE,
     CONF_LOCATION_NAME,
     DEFAULT_SCAN_INTERVAL,
     DEFAULT_LANGUAGE,
     DOMAIN,
+    HISTORY_STORE_RETENTION,
     ANWS_AOAWS_COORDINATOR,
     ANWS_AOAWS_DATA,
+    ANWS_AOAWS_ENTRIES,
+    ANWS_AOAWS_FEED,
     ANWS_AOAWS_NAME,
+    ANWS_AOAWS_SITE,
+    ANWS_AOAWS_SITES,
     PLATFORMS,
+    REFRESH_COALESCE_WINDOW,
+    SIGNAL_NEW_SITE,
+    SITE_LISTENER,
+    STARTUP_REFRESH_SPREAD,
     UPDATE_LISTENER,
 )
-from .data import AnwsAoawseData
+from .data import AnwsAoawsFeed, AnwsAoawseData
+from .scheduler import random_delay
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,39 +47,229 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     """Set up a ANWS AOAWS entry."""
 
     site_name = config_entry.data[CONF_LOCATION_NAME]
+
+    feed_hass_data = await _async_get_feed(hass, config_entry)
+    anws_aoaws_feed = feed_hass_data[ANWS_AOAWS_DATA]
+    anws_aoaws_coordinator = feed_hass_data[ANWS_AOAWS_COORDINATOR]
+
+    entry_hass_data = await _async_setup_sites(hass, config_entry)
+    if entry_hass_data is None and not anws_aoaws_feed.fetched_recently():
+        # The site may be missing from the cached or an older feed, nothing
+        # polls it while no entity listens
+        await anws_aoaws_coordinator.async_refresh()
+        entry_hass_data = await _async_setup_sites(hass, config_entry)
+    if entry_hass_data is None:
+        await _async_release_feed(hass, config_entry)
+        raise ConfigEntryNotReady()
+
+    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = entry_hass_data
+
+    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+
+    if site_name == ALL_SITES:
+        entry_hass_data[SITE_LISTENER] = anws_aoaws_coordinator.async_add_listener(
+            partial(_async_add_new_sites, hass, config_entry)
+        )
+
+    update_listener = config_entry.add_update_listener(async_update_options)
+    hass.data[DOMAIN][config_entry.entry_id][UPDATE_LISTENER] = update_listener
+
+    return True
+
+
+async def _async_setup_sites(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Set up the sites of an entry, return None when none is in the feed."""
+    site_name = config_entry.data[CONF_LOCATION_NAME]
+    if site_name != ALL_SITES:
+        return await _async_setup_site(hass, config_entry, site_name)
+
+    # One entry fanning the shared feed out to a device per airport
+    feed_hass_data = hass.data[DOMAIN][ANWS_AOAWS_FEED]
+    sites = {}
+    for location in sorted(feed_hass_data[ANWS_AOAWS_DATA].locations):
+        site_hass_data = await _async_setup_site(hass, config_entry, location)
+        if site_hass_data is not None:
+            sites[location] = site_hass_data
+    if not sites:
+        return None
+    return {
+        ANWS_AOAWS_COORDINATOR: feed_hass_data[ANWS_AOAWS_COORDINATOR],
+        ANWS_AOAWS_SITES: sites,
+    }
+
+
+async def _async_setup_site(hass: HomeAssistant, config_entry: ConfigEntry, site_name):
+    """Set up the data of a site, return None when it is not in the feed."""
     language = _get_config_value(config_entry, CONF_LANGUAGE, DEFAULT_LANGUAGE)
+    feed_hass_data = hass.data[DOMAIN][ANWS_AOAWS_FEED]
+    anws_aoaws_feed = feed_hass_data[ANWS_AOAWS_DATA]
 
-    anws_aoaws_data = AnwsAoawseData(hass, site_name, language)
+    anws_aoaws_data = AnwsAoawseData(hass, site_name, language, anws_aoaws_feed)
     await anws_aoaws_data.async_update_site()
     if anws_aoaws_data.site_name is None:
-        raise ConfigEntryNotReady()
+        return None
 
-    anws_aoaws_coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=f"ANWS AOAWS for {site_name}",
-        update_method=anws_aoaws_data.async_update,
-        update_interval=DEFAULT_SCAN_INTERVAL,
-    )
+    # Register the site before converting the already downloaded feed, so a
+    # refresh running meanwhile converts it too
+    site_listener = anws_aoaws_feed.async_add_site(anws_aoaws_data)
+    if anws_aoaws_feed.async_skipped_site(site_name):
+        await feed_hass_data[ANWS_AOAWS_COORDINATOR].async_refresh()
+    await anws_aoaws_data.async_update_from_feed()
+    if anws_aoaws_data.now is None:
+        site_listener()
+        return None
 
-    anws_aoaws_hass_data = hass.data.setdefault(DOMAIN, {})
-    anws_aoaws_hass_data[config_entry.entry_id] = {
+    # Opened once the site is confirmed, a site failing again and again
+    # would compact its file on every try
+    if _get_config_value(config_entry, CONF_HISTORY_STORE, False):
+        anws_aoaws_data.async_set_history_store(
+            await hass.async_add_executor_job(_open_history_store, hass, site_name)
+        )
+
+    site_hass_data = {
         ANWS_AOAWS_DATA: anws_aoaws_data,
-        ANWS_AOAWS_COORDINATOR: anws_aoaws_coordinator,
+        ANWS_AOAWS_COORDINATOR: feed_hass_data[ANWS_AOAWS_COORDINATOR],
         ANWS_AOAWS_NAME: site_name,
+        SITE_LISTENER: site_listener,
     }
+    if config_entry.data[CONF_LOCATION_NAME] == ALL_SITES:
+        site_hass_data[ANWS_AOAWS_SITE] = site_name
+    return site_hass_data
 
-    # Fetch initial data so we have data when entities subscribe
-    await anws_aoaws_coordinator.async_refresh()
-    if anws_aoaws_data.now is None:
-        raise ConfigEntryNotReady()
 
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+@callback
+def _async_add_new_sites(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Set up the sites which showed up in the feed since the entry was set up."""
+    sites = hass.data[DOMAIN][config_entry.entry_id][ANWS_AOAWS_SITES]
+    anws_aoaws_feed = hass.data[DOMAIN][ANWS_AOAWS_FEED][ANWS_AOAWS_DATA]
+    for location in anws_aoaws_feed.locations - sites.keys():
+        # Taken until set up, so the next update does not set it up again
+        sites[location] = None
+        config_entry.async_create_task(
+            hass, _async_add_new_site(hass, config_entry, sites, location)
+        )
 
-    update_listener = config_entry.add_update_listener(async_update_options)
-    hass.data[DOMAIN][config_entry.entry_id][UPDATE_LISTENER] = update_listener
 
-    return True
+async def _async_add_new_site(hass: HomeAssistant, config_entry: ConfigEntry, sites, location):
+    """Set up a new site and let the platforms add its entities."""
+    site_hass_data = await _async_setup_site(hass, config_entry, location)
+    if site_hass_data is None:
+        sites.pop(location, None)
+        return
+
+    _LOGGER.info("Adding the new ANWS AOAWS site %s", location)
+    sites[location] = site_hass_data
+    async_dispatcher_send(
+        hass, SIGNAL_NEW_SITE.format(config_entry.entry_id), site_hass_data
+    )
+
+
+def site_hass_datas(entry_hass_data):
+    """Return the data of the sites of an entry, one for a single airport entry."""
+    if ANWS_AOAWS_SITES in entry_hass_data:
+        return [
+            site_hass_data
+            for site_hass_data in entry_hass_data[ANWS_AOAWS_SITES].values()
+            if site_hass_data is not None
+        ]
+    return [entry_hass_data]
+
+
+async def _async_get_feed(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Return the feed shared by all entries, fetching it on first use.
+
+    The entry uses the feed until it releases it with _async_release_feed.
+    """
+    anws_aoaws_hass_data = hass.data.setdefault(DOMAIN, {})
+    feed_hass_data = anws_aoaws_hass_data.get(ANWS_AOAWS_FEED)
+    if feed_hass_data is None:
+        anws_aoaws_feed = AnwsAoawsFeed(hass)
+
+        async def async_update_feed():
+            """Update the feed and follow the issuance of the reports."""
+            digest = await anws_aoaws_feed.async_update()
+            anws_aoaws_coordinator.update_interval = (
+                anws_aoaws_feed.async_next_update_interval()
+            )
+            return digest
+
+        # Not immediate, so the requests of all the entities in the window
+        # end in a single fetch
+        refresh_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=REFRESH_COALESCE_WINDOW,
+            immediate=False,
+        )
+        # Not tied to the entry being set up, which would shut it down
+        # when unloaded, it is shut down with the last entry
+        anws_aoaws_coordinator = DataUpdateCoordinator(
+            hass,
+            _LOGGER,
+            config_entry=None,
+            name="ANWS AOAWS",
+            update_method=async_update_feed,
+            update_interval=DEFAULT_SCAN_INTERVAL,
+            request_refresh_debouncer=refresh_debouncer,
+            always_update=False,
+        )
+
+        async def async_refresh_requested():
+            """Refresh on the request of an entity, unless the feed is fresh."""
+            if not anws_aoaws_feed.fetched_recently():
+                await anws_aoaws_coordinator.async_refresh()
+
+        # Set after the coordinator, which points its debouncer at
+        # async_refresh, so every update_entity goes through the guard
+        refresh_debouncer.function = async_refresh_requested
+        feed_hass_data = anws_aoaws_hass_data[ANWS_AOAWS_FEED] = {
+            ANWS_AOAWS_DATA: anws_aoaws_feed,
+            ANWS_AOAWS_COORDINATOR: anws_aoaws_coordinator,
+            ANWS_AOAWS_ENTRIES: set(),
+        }
+
+    # Taken before waiting for the setup, so the feed is not dropped meanwhile
+    feed_hass_data[ANWS_AOAWS_ENTRIES].add(config_entry.entry_id)
+    anws_aoaws_feed = feed_hass_data[ANWS_AOAWS_DATA]
+    anws_aoaws_coordinator = feed_hass_data[ANWS_AOAWS_COORDINATOR]
+    async with anws_aoaws_feed.setup_lock:
+        if anws_aoaws_feed.data is None:
+            if await anws_aoaws_feed.async_load_cache():
+                # Start from the cached feed and get the live one once the
+                # entities listen, after a random delay, so Home Assistant
+                # instances starting together do not fetch at once
+                anws_aoaws_coordinator.update_interval = random_delay(
+                    STARTUP_REFRESH_SPREAD
+                )
+            else:
+                await anws_aoaws_coordinator.async_refresh()
+
+    return feed_hass_data
+
+
+async def _async_release_feed(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Stop using the shared feed, shut it down once no entry uses it."""
+    anws_aoaws_hass_data = hass.data[DOMAIN]
+    feed_hass_data = anws_aoaws_hass_data[ANWS_AOAWS_FEED]
+    feed_hass_data[ANWS_AOAWS_ENTRIES].discard(config_entry.entry_id)
+    if feed_hass_data[ANWS_AOAWS_ENTRIES]:
+        return
+    del anws_aoaws_hass_data[ANWS_AOAWS_FEED]
+    if not anws_aoaws_hass_data:
+        hass.data.pop(DOMAIN)
+    await feed_hass_data[ANWS_AOAWS_COORDINATOR].async_shutdown()
+
+
+def _open_history_store(hass: HomeAssistant, site_name):
+    """Open the long-term history file of a site, dropping the expired records."""
+    # Only loaded by the entries which keep the history
+    from .history_store import SiteHistoryStore  # pylint: disable=import-outside-toplevel
+
+    history_store = SiteHistoryStore(
+        hass.config.path(STORAGE_DIR, DOMAIN, f"{site_name}.bin")
+    )
+    history_store.compact(dt_util.utcnow() - HISTORY_STORE_RETENTION)
+    return history_store
 
 
 async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry):
@@ -81,11 +288,14 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry):
         )
     )
     if unload_ok:
-        update_listener = hass.data[DOMAIN][config_entry.entry_id][UPDATE_LISTENER]
-        update_listener()
-        hass.data[DOMAIN].pop(config_entry.entry_id)
-        if not hass.data[DOMAIN]:
-            hass.data.pop(DOMAIN)
+        entry_hass_data = hass.data[DOMAIN].pop(config_entry.entry_id)
+        entry_hass_data[UPDATE_LISTENER]()
+        if ANWS_AOAWS_SITES in entry_hass_data:
+            entry_hass_data[SITE_LISTENER]()
+        for site_hass_data in site_hass_datas(entry_hass_data):
+            site_hass_data[SITE_LISTENER]()
+            await site_hass_data[ANWS_AOAWS_DATA].async_close_history_store()
+        await _async_release_feed(hass, config_entry)
     return unload_ok
 
 
@@ -94,8 +304,29 @@ def _get_config_value(config_entry, key, default):
         return config_entry.options.get(key, default)
     return config_entry.data.get(key, default)
 
-def device_info(config_entry: ConfigEntry) -> DeviceInfo:
+
+def feed_device_info() -> DeviceInfo:
+    """Build and return the device info of the feed shared by the entries."""
+    return DeviceInfo(
+        entry_type=DeviceEntryType.SERVICE,
+        identifiers={(DOMAIN, ANWS_AOAWS_FEED)},
+        manufacturer="Taiwan ANWS",
+        name="ANWS AOAWS Feed",
+        configuration_url="https://aoaws.anws.gov.tw/AWS",
+    )
+
+
+def device_info(config_entry: ConfigEntry, site_name=None) -> DeviceInfo:
     """Build and return the device info for EC."""
+    if site_name is not None:
+        # An airport of an entry for all the airports
+        return DeviceInfo(
+            entry_type=DeviceEntryType.SERVICE,
+            identifiers={(DOMAIN, f"{config_entry.entry_id}_{site_name}")},
+            manufacturer="Taiwan ANWS",
+            name=site_name,
+            configuration_url="https://aoaws.anws.gov.tw/AWS",
+        )
     return DeviceInfo(
         entry_type=DeviceEntryType.SERVICE,
         identifiers={(DOMAIN, config_entry.entry_id)},
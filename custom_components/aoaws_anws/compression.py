@@ -0,0 +1,83 @@
+"""Decompression of the ANWS AOAWS responses as they are received.
+
+gzip and deflate come with zlib. Brotli is offered only when the brotli or
+brotlicffi package is installed, it is loaded on first use.
+"""
+import zlib
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    """Return the brotli module, None when none is installed."""
+    try:
+        import brotli  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        try:
+            import brotlicffi as brotli  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return None
+    return brotli
+
+
+def accept_encoding():
+    """Return the Accept-Encoding of the requests."""
+    if _brotli() is not None:
+        return "gzip, deflate, br"
+    return "gzip, deflate"
+
+
+class StreamDecompressor:
+    """Decompress a response chunk by chunk.
+
+    Raise ValueError for an encoding which was not offered or a corrupt
+    body.
+    """
+
+    def __init__(self, encoding):
+        """Initialize the decompressor for a Content-Encoding header."""
+        encoding = (encoding or "identity").strip().lower()
+        self._decompress = None
+        self._flush = None
+        self._raw_deflate = False
+        if encoding in ("gzip", "x-gzip"):
+            self._set_zlib(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            # Servers send raw deflate as well as the zlib format
+            self._set_zlib(zlib.MAX_WBITS)
+            self._raw_deflate = True
+        elif encoding == "br" and _brotli() is not None:
+            decompressor = _brotli().Decompressor()
+            # brotli calls it process, brotlicffi decompress
+            self._decompress = getattr(decompressor, "process", None) or decompressor.decompress
+        elif encoding != "identity":
+            raise ValueError(f"Unsupported Content-Encoding {encoding}")
+
+    def _set_zlib(self, wbits):
+        decompressor = zlib.decompressobj(wbits)
+        self._decompress = decompressor.decompress
+        self._flush = decompressor.flush
+
+    def decompress(self, chunk):
+        """Return the decompressed data of the next chunk."""
+        if self._decompress is None:
+            return chunk
+        if self._raw_deflate:
+            self._raw_deflate = False
+            try:
+                return self._decompress(chunk)
+            except zlib.error:
+                self._set_zlib(-zlib.MAX_WBITS)
+        try:
+            return self._decompress(chunk)
+        except Exception as err:  # zlib.error or the error of the brotli package
+            raise ValueError(f"Corrupt compressed body: {err}") from err
+
+    def flush(self):
+        """Return the data left once the whole body was received."""
+        if self._flush is None:
+            return b""
+        try:
+            return self._flush()
+        except zlib.error as err:
+            raise ValueError(f"Corrupt compressed body: {err}") from err
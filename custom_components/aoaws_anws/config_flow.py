@@ -10,15 +10,21 @@ from homeassistant.const import CONF_NAME, MAJOR_VERSION, MINOR_VERSION
 from homeassistant.helpers import config_validation as cv
 
 from .const import (
+    ALL_SITES,
+    ALL_SITES_NAME,
+    CONF_HISTORY_STORE,
     CONF_LANGUAGE,
     CONF_LOCATION_NAME,
     CONFIG_FLOW_VERSION,
     DEFAULT_LANGUAGE,
     DOMAIN,
+    ANWS_AOAWS_COORDINATOR,
+    ANWS_AOAWS_DATA,
+    ANWS_AOAWS_FEED,
     LANGUAGES,
     SITES
 )
-from .data import AnwsAoawseData
+from .data import FetchError, async_fetch_locations
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,14 +36,29 @@ async def validate_input(hass: core.HomeAssistant, data):
     """
 
     site_name = data[CONF_LOCATION_NAME]
-    language = data[CONF_LANGUAGE]
 
-    anws_aoaws_data = AnwsAoawseData(hass, site_name, language)
-    await anws_aoaws_data.async_update_site()
-    if anws_aoaws_data.site_name is None:
+    # Reuse the feed of the already configured entries when there is one,
+    # else fetch it once, without caching it
+    feed_hass_data = hass.data.get(DOMAIN, {}).get(ANWS_AOAWS_FEED)
+    if feed_hass_data is not None:
+        anws_aoaws_feed = feed_hass_data[ANWS_AOAWS_DATA]
+        if anws_aoaws_feed.data is None:
+            await feed_hass_data[ANWS_AOAWS_COORDINATOR].async_refresh()
+        locations = anws_aoaws_feed.locations
+    else:
+        try:
+            locations = await async_fetch_locations(hass)
+        except FetchError as err:
+            raise CannotConnect() from err
+
+    if site_name == ALL_SITES:
+        if not locations:
+            raise CannotConnect()
+        return {"site_name": ALL_SITES_NAME}
+    if site_name not in locations:
         raise CannotConnect()
 
-    return {"site_name": anws_aoaws_data.site_name}
+    return {"site_name": site_name}
 
 
 class AnwsAoawsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -60,6 +81,13 @@ class AnwsAoawsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 f"{user_input[CONF_LOCATION_NAME]}"
             )
             self._abort_if_unique_id_configured()
+            # The entry for all the airports already holds every single airport
+            locations = {
+                entry.data[CONF_LOCATION_NAME]
+                for entry in self._async_current_entries(include_ignore=False)
+            }
+            if locations and ALL_SITES in locations | {user_input[CONF_LOCATION_NAME]}:
+                return self.async_abort(reason="all_sites_conflict")
 
             try:
                 info = await validate_input(self.hass, user_input)
@@ -77,7 +105,7 @@ class AnwsAoawsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         data_schema = vol.Schema(
             {
                 vol.Required(CONF_LOCATION_NAME): vol.In(
-                    SITES
+                    {ALL_SITES: ALL_SITES_NAME, **{site: site for site in SITES}}
                 ),
                 vol.Optional(CONF_LANGUAGE, default=DEFAULT_LANGUAGE): vol.In(
                     LANGUAGES
@@ -117,6 +145,10 @@ class AnwsAoawsOptionsFlow(config_entries.OptionsFlow):
                         CONF_LANGUAGE, DEFAULT_LANGUAGE
                     ),
                 ): vol.In(LANGUAGES),
+                vol.Optional(
+                    CONF_HISTORY_STORE,
+                    default=self.config_entry.options.get(CONF_HISTORY_STORE, False),
+                ): bool,
             }
         )
 
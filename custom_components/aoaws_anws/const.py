@@ -1,11 +1,13 @@
 """Constants for ANWS AOAWS Integration."""
-from datetime import timedelta
+from datetime import timedelta, timezone
 from homeassistant.const import (
+    UnitOfInformation,
     UnitOfLength,
     PERCENTAGE,
     UnitOfSpeed,
     UnitOfTemperature,
     UnitOfPressure,
+    UnitOfTime,
     UV_INDEX,
 )
 from homeassistant.components.sensor import SensorDeviceClass
@@ -35,19 +37,69 @@ ATTR_LAST_UPDATE = "last_update"
 ATTR_SENSOR_ID = "sensor_id"
 ATTR_SITE_ID = "site_id"
 ATTR_SITE_NAME = "site_name"
+ATTR_STALE = "stale"
 ATTR_WEATHER_TEXT = "weather"
+CONF_HISTORY_STORE = "history_store"
 CONF_LANGUAGE = "language"
 CONF_LOCATION_NAME = "location_name"
 CONFIG_FLOW_VERSION = 1
 UPDATE_LISTENER = "update_listener"
+SITE_LISTENER = "site_listener"
+SIGNAL_NEW_SITE = f"{DOMAIN}_new_site_{{}}"
+SIGNAL_FEED_UPDATED = f"{DOMAIN}_feed_updated"
 PLATFORMS = ["sensor", "weather"]
 
 DEFAULT_SCAN_INTERVAL = timedelta(minutes=5)
 
+# Refresh requests of the entities, e.g. by homeassistant.update_entity,
+# within the window are coalesced into one fetch, and none is made while
+# the feed is younger than the minimum age
+REFRESH_COALESCE_WINDOW = 1.0  # seconds
+MIN_REFRESH_AGE = timedelta(seconds=30)
+
+# Adaptive polling around the routine METAR issuance, see scheduler.py
+METAR_CYCLE = timedelta(minutes=30)
+DEFAULT_PUBLISH_LAG = timedelta(minutes=3)
+MIN_SCAN_INTERVAL = timedelta(minutes=1)
+MAX_SCAN_INTERVAL = timedelta(minutes=15)
+DENSE_SCAN_INTERVAL = timedelta(minutes=1)
+DENSE_WINDOW = timedelta(minutes=10)
+FAST_SCAN_INTERVAL = timedelta(minutes=2)
+FAST_MODE_DURATION = timedelta(hours=1)
+# Bad weather lasting longer no longer keeps the fast mode on by itself
+BAD_WEATHER_FAST_LIMIT = timedelta(hours=2)
+# Random offsets, so installations started together do not poll in lockstep
+POLL_PHASE_SPREAD = timedelta(seconds=30)
+STARTUP_REFRESH_SPREAD = timedelta(seconds=30)
+
+# Observations kept per site, e.g. 48 hours of half hourly reports and SPECIs
+HISTORY_CAPACITY = 128
+HISTORY_MAX_AGE = timedelta(hours=48)
+
+# Long-term history files, see history_store.py
+HISTORY_STORE_RETENTION = timedelta(days=365)
+
+# The last good feed is cached in the storage for a fast startup
+STORAGE_KEY = f"{DOMAIN}.feed"
+STORAGE_VERSION = 1
+CACHE_MAX_AGE = timedelta(hours=2)
+CACHE_SAVE_DELAY = 30  # seconds
+STALE_AFTER = timedelta(minutes=30)
+
+# The airports report in UTC, dates are shown in Taiwan time
+TIME_ZONE = timezone(timedelta(hours=8))
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 ANWS_AOAWS_DATA = "anws_aoaws_data"
 ANWS_AOAWS_COORDINATOR = "anws_aoaws_coordinator"
+ANWS_AOAWS_ENTRIES = "anws_aoaws_entries"
+ANWS_AOAWS_FEED = "anws_aoaws_feed"
 ANWS_AOAWS_MONITORED_CONDITIONS = "anws_aoaws_monitored_conditions"
 ANWS_AOAWS_NAME = "anws_aoaws_name"
+ANWS_AOAWS_SITE = "anws_aoaws_site"
+ANWS_AOAWS_SITES = "anws_aoaws_sites"
+ANWS_AOAWS_STATS_ENTRY = "anws_aoaws_stats_entry"
+ANWS_AOAWS_STATS_ADDERS = "anws_aoaws_stats_adders"
 
 USER_AGENT = ""
 # curl -H "X-Requested-With: XMLHttpRequest" -H "Accept-Language: zh-TW,zh-Hant;q=0.9" -H "Accept: application/json, text/javascript, */*; q=0.01" -H "User-Agent: Mozilla/5.0 (iPhone; CPU iPhone OS 26_3_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/146.0.7680.151 Mobile/15E148 Safari/604.1" --compressed "https://aoaws.anws.gov.tw/Home/get_metar_data"
@@ -57,6 +109,19 @@ HA_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
 BASE_URL = 'https://aoaws.anws.gov.tw/Home/get_metar_data'
 
 REQUEST_TIMEOUT = 10  # seconds
+READ_CHUNK_SIZE = 16384  # bytes
+
+# Fetch policy when ANWS AOAWS struggles, see retry.py
+FETCH_RETRIES = 2
+RETRY_BASE_DELAY = 2  # seconds
+RETRY_MAX_DELAY = 10  # seconds
+BREAKER_THRESHOLD = 3  # failed polls in a row
+BREAKER_COOLDOWN = timedelta(minutes=5)
+BREAKER_MAX_COOLDOWN = timedelta(hours=1)
+
+# The location of an entry for all the airports in the feed
+ALL_SITES = "all"
+ALL_SITES_NAME = "All Taiwan airports"
 
 SITES = [
     "Taoyuan",
@@ -187,6 +252,33 @@ VISIBILITY_CLASSES = {
     "Extreme Excellent": 10
 }
 
+# Weather phrase to condition, the first class listing a phrase wins
+CONDITION_MAP = {
+    phrase: condition
+    for condition, phrases in reversed(CONDITION_CLASSES.items())
+    for phrase in phrases
+}
+
+# Conditions which switch the polling to the fast mode, not exceptional,
+# whose haze, smoke or heat are everyday conditions in Taiwan
+FAST_POLL_CONDITIONS = (
+    ATTR_CONDITION_HAIL,
+    ATTR_CONDITION_LIGHTNING,
+    ATTR_CONDITION_LIGHTNING_RAINY,
+    ATTR_CONDITION_POURING,
+    ATTR_CONDITION_SNOWY,
+    ATTR_CONDITION_SNOWY_RAINY,
+    ATTR_CONDITION_WINDY,
+    ATTR_CONDITION_WINDY_VARIANT,
+)
+
+# Visibility classes sorted by their upper bound in km, for bisect
+VISIBILITY_NAMES = tuple(sorted(VISIBILITY_CLASSES, key=VISIBILITY_CLASSES.get))
+VISIBILITY_THRESHOLDS = tuple(VISIBILITY_CLASSES[name] for name in VISIBILITY_NAMES)
+
+# The cloud coverage in % of the METAR cloud covers
+CLOUD_COVER_PERCENT = {"FEW": 25, "SCT": 50, "BKN": 75, "OVC": 100, "VV": 100}
+
 # Sensor types are defined as:
 #   variable -> [0]title, [1]device_class, [2]units, [3]icon, [4]enabled_by_default
 SENSOR_TYPES = {
@@ -238,5 +330,27 @@ SENSOR_TYPES = {
     #     "mdi:weather-rainy",
     #     False,
     # ],
-    # "humidity": ["Humidity", SensorDeviceClass.HUMIDITY, PERCENTAGE, None, False],
+    "humidity": ["Humidity", SensorDeviceClass.HUMIDITY, PERCENTAGE, None, False],
+    "apparent_temperature": [
+        "Apparent Temperature",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        None,
+        False
+    ],
+    "cloud_coverage": ["Cloud Coverage", None, PERCENTAGE, "mdi:weather-cloudy", False],
+    "flight_category": ["Flight Category", None, None, "mdi:airplane", False],
+}
+
+# Diagnostic sensors of the timings of the feed, see stats.py
+STATS_SENSOR_TYPES = {
+    "fetch": ["Fetch Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS, "mdi:download-network"],
+    "decode": ["Decode Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS, "mdi:code-json"],
+    "index": ["Index Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS, "mdi:table-search"],
+    "convert": ["Convert Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS, "mdi:swap-horizontal"],
+    "bytes_received": ["Bytes Received", SensorDeviceClass.DATA_SIZE, UnitOfInformation.BYTES, "mdi:download"],
+    "bytes_transferred": [
+        "Bytes Transferred", SensorDeviceClass.DATA_SIZE, UnitOfInformation.BYTES, "mdi:download-network"
+    ],
+    "entities_written": ["Entities Written", None, None, "mdi:pencil"],
 }
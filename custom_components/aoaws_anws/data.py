@@ -1,274 +1,947 @@
 """Common ANWS AOAWS Data class used by both sensor and entity."""
 
+import asyncio
+import hashlib
 import logging
-import re
 import time
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
+from datetime import datetime, timezone
 from http import HTTPStatus
-import requests
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-
-from bs4 import BeautifulSoup
+from typing import Any, NamedTuple
+import aiohttp
+
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 from homeassistant.const import (
+    PERCENTAGE,
     UnitOfLength,
+    UnitOfPressure,
     UnitOfTemperature,
     UnitOfSpeed
 )
+from .compression import StreamDecompressor, accept_encoding
 from .const import (
+    ALL_SITES,
     BASE_URL,
+    CACHE_MAX_AGE,
+    CACHE_SAVE_DELAY,
+    CONDITION_MAP,
+    CONF_LOCATION_NAME,
+    DATE_FORMAT,
+    DOMAIN,
+    FAST_POLL_CONDITIONS,
+    FETCH_RETRIES,
+    MIN_REFRESH_AGE,
     HA_USER_AGENT,
-    REQUEST_TIMEOUT
+    MIN_SCAN_INTERVAL,
+    READ_CHUNK_SIZE,
+    REQUEST_TIMEOUT,
+    SIGNAL_FEED_UPDATED,
+    STALE_AFTER,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    TIME_ZONE,
+    VISIBILITY_NAMES,
+    VISIBILITY_THRESHOLDS
+)
+from .decoder import FeedParser, project_record
+from .derived import (
+    apparent_temperature,
+    cloud_coverage,
+    flight_category,
+    relative_humidity,
 )
+from .history import ObservationHistory
+from .report import MetarReport, parse_report
+from .retry import CircuitBreaker, backoff_delay
+from .scheduler import IssuanceScheduler
+from .stats import FeedStats
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class Element():
-    def __init__(self, field_code=None, value=None, units=None, text=None):
+@lru_cache(maxsize=1024)
+def parse_datatime(value):
+    """Parse a datatime of the feed, e.g. 2024-01-31T23:30:00Z, to UTC.
+
+    The feed always uses this fixed format and repeats the same values
+    across polls, so the fields are sliced directly and the result is
+    memoized.
+    """
+    value = value.strip()
+    return datetime(
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19]),
+        tzinfo=timezone.utc,
+    )
+
+
+def resolve_condition(weather):
+    """Return the condition of a weather phrase of the feed."""
+    return CONDITION_MAP.get(weather.lower().strip())
+
 
-        self.field_code = field_code
-        self.value = value
-        self.units = units
+def classify_visibility(visibility):
+    """Return the visibility class of a visibility in km."""
+    index = bisect_left(VISIBILITY_THRESHOLDS, visibility)
+    if index == len(VISIBILITY_NAMES):
+        return VISIBILITY_NAMES[0]
+    return VISIBILITY_NAMES[index]
 
-        # For elements which can also have a text value
-        self.text = text
+
+def format_date(value):
+    """Format an observation date in the local time of the airports."""
+    if value is None:
+        return None
+    return value.astimezone(TIME_ZONE).strftime(DATE_FORMAT)
+
+
+class Element(NamedTuple):
+    """A value of an observation with its units."""
+
+    field_code: str | None = None
+    value: Any = None
+    units: str | None = None
+
+    # For elements which can also have a text value
+    text: str | None = None
 
     def __str__(self):
         return str(self.value) + ' ' + str(self.units)
 
 
+@dataclass(frozen=True, slots=True)
 class Observation:
-    def __init__(self):
-        self.name = None
-        self.date = None
-        self.weather = None
-        self.temperature = None
-        self.wind_speed = None
-        self.wind_direction = None
-        self.wind_gust = None
-        self.visibility = None
-        self.uv = None
-        self.precipitation = None
-        self.humidity = None
-        self.pressure = None
-        self.pressure_tendency = None
-        self.dew_point = None
-        self.cloud_coverage = None
-        self.cloud_ceiling = None
+    """An immutable observation of a site."""
+
+    name: str | None = None
+    date: datetime | None = None
+    weather: Element | None = None
+    temperature: Element | None = None
+    apparent_temperature: Element | None = None
+    wind_speed: Element | None = None
+    wind_direction: Element | None = None
+    wind_gust: Element | None = None
+    visibility: Element | None = None
+    uv: Element | None = None
+    precipitation: Element | None = None
+    humidity: Element | None = None
+    pressure: Element | None = None
+    pressure_tendency: Element | None = None
+    dew_point: Element | None = None
+    cloud_coverage: Element | None = None
+    cloud_ceiling: Element | None = None
+    report: MetarReport | None = None
+    condition: str | None = None
+    visibility_class: str | None = None
+    flight_category: str | None = None
 
     def __iter__(self):
-        for attr, value in self.__dict__.items():
-            yield attr, value
+        for attr in self.__slots__:
+            yield attr, getattr(self, attr)
 
     def elements(self):
         """Return a list of the Elements which are not None"""
-        elements = [el[1] for el in self.__dict__.items() if isinstance(el[1], Element)]
+        elements = [value for attr, value in self if isinstance(value, Element)]
 
         return elements
 
 
-class AnwsAoawseData:
-    """Get current AOAWS from ANWS.
+def derive_observations(observations):
+    """Add the derived fields to the observations of a snapshot, in one pass.
+
+    observations are pairs of the fields of an Observation being built and
+    the record of the feed they are converted from.
+    """
+    for fields, record in observations:
+        report = fields.get("report")
+        dew_point = fields.get("dew_point")
+
+        # The converters default a missing TEMP or WDSD to 0, the METAR is
+        # used for them instead
+        temperature = wind_speed = None
+        if record["TEMP"] is not None:
+            temperature = fields["temperature"].value
+        elif report is not None:
+            temperature = report.temperature
+        if record["WDSD"] is not None:
+            wind_speed = fields["wind_speed"].value
+        elif report is not None and report.wind_speed is not None:
+            wind_speed = report.wind_speed * 1.85
+
+        if temperature is not None and dew_point is not None:
+            fields["humidity"] = Element(
+                "H",
+                value=relative_humidity(temperature, dew_point.value),
+                units=PERCENTAGE,
+            )
+            if wind_speed is not None:
+                fields["apparent_temperature"] = Element(
+                    "T",
+                    value=apparent_temperature(temperature, dew_point.value, wind_speed),
+                    units=UnitOfTemperature.CELSIUS,
+                )
+
+        if report is not None:
+            coverage = cloud_coverage(report, record["REPORT"])
+            if coverage is not None:
+                fields["cloud_coverage"] = Element("C", value=coverage, units=PERCENTAGE)
+
+        if record["VIS"] is not None:
+            ceiling = record["CEILING"]
+            if ceiling.isdigit():
+                ceiling = int(ceiling)
+            else:
+                ceiling = report.ceiling if report is not None else None
+            fields["flight_category"] = flight_category(ceiling, record["VIS"])
+
+
+def _value(record, key, default):
+    """Return a number of a projected record, default when it is missing."""
+    value = record[key]
+    return default if value is None else value
+
+
+class SiteSnapshot(NamedTuple):
+    """The observations of a site converted from one feed."""
+
+    now: Observation
+    forecast: tuple[Observation, ...]
+
+
+class FetchedFeed(NamedTuple):
+    """A decoded feed, with the durations in ms of decoding and indexing it."""
 
-    Use API calls have had to be wrapped with the standard hassio helper
-    async_add_executor_job.
+    data: dict
+    locations: frozenset
+    decode: float
+    index: float
+
+
+class ConvertedFeed(NamedTuple):
+    """The snapshots of the sites converted from a feed, in ms."""
+
+    snapshots: dict
+    datatimes: dict
+    convert: float
+
+
+class ReceivedFeed(NamedTuple):
+    """A response, feed is None when it is the last feed received again."""
+
+    feed: FetchedFeed | None
+    digest: bytes
+    size: int
+
+
+class FetchError(HomeAssistantError):
+    """The feed could not be fetched."""
+
+
+class _RetryableError(FetchError):
+    """The feed could not be fetched, but a retry may succeed."""
+
+
+def _request_headers():
+    """Return the headers of a request of the feed."""
+    return {
+        'X-Requested-With': 'XMLHttpRequest',
+        'Accept': 'application/json, text/javascript, */*; q=0.01',
+        'Accept-Encoding': accept_encoding(),
+        'User-Agent': HA_USER_AGENT
+    }
+
+
+async def async_fetch_locations(hass, uri=BASE_URL):
+    """Fetch the feed once and return its locations, e.g. in the config flow.
+
+    No record is decoded and nothing is cached. Raise FetchError when the
+    feed could not be fetched.
+    """
+    session = async_get_clientsession(hass, verify_ssl=False)
+    try:
+        async with session.post(
+            uri,
+            headers=_request_headers(),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            auto_decompress=False,
+        ) as response:
+            if response.status != HTTPStatus.OK:
+                raise FetchError(f"Received error {response.status}")
+            decompressor = StreamDecompressor(
+                response.headers.get(aiohttp.hdrs.CONTENT_ENCODING)
+            )
+            parser = FeedParser(frozenset())
+            async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                parser.feed(decompressor.decompress(chunk))
+            parser.feed(decompressor.flush())
+            parser.close()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+        raise FetchError(repr(err)) from err
+    return frozenset(parser.locations)
+
+
+class AnwsAoawsFeed:
+    """Get the whole airport list from ANWS once for every configured site.
+
+    The feed is shared by all config entries, so each poll downloads and
+    decodes the airport list a single time and hands it to the sites which
+    are registered on it.
     """
 
-    def __init__(self, hass, site_name, language):
+    def __init__(self, hass, uri=BASE_URL, session=None):
+        """Initialize the feed object.
+
+        The integration wide keep-alive session of Home Assistant is used
+        unless another session is given, e.g. one for a local test server.
+        """
+        self._hass = hass
+        self._session = session or async_get_clientsession(hass, verify_ssl=False)
+        self._sites = []
+
+        # Holds the current data from the ANWS AOAWS, indexed by location_en
+        self.data = None
+        self.uri = uri
+        self.setup_lock = asyncio.Lock()
+        # Only one update runs at a time, also when requested during a setup
+        self._update_lock = asyncio.Lock()
+
+        # The last good feed is kept in the storage for a fast startup
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.last_fetched = None
+        self.from_cache = False
+
+        self.scheduler = IssuanceScheduler()
+        self.stats = FeedStats()
+        self.breaker = CircuitBreaker()
+
+        # Validators of the last response, used to skip unchanged feeds
+        self._etag = None
+        self._last_modified = None
+        # The compressed size of the last body received
+        self.transferred = 0
+        self._digest = None
+        self._datatimes = {}
+        # Every location of the feed, also the ones whose records are skipped
+        self._locations = frozenset()
+
+    @property
+    def locations(self):
+        """Return the locations found in the current feed."""
+        return self._locations
+
+    @property
+    def stale(self):
+        """Return if the feed was not confirmed by ANWS AOAWS lately."""
+        if self.from_cache or self.breaker.is_open or self.last_fetched is None:
+            return True
+        return dt_util.utcnow() - self.last_fetched > STALE_AFTER
+
+    @callback
+    def fetched_recently(self):
+        """Return if the feed is too young to be fetched again on request."""
+        if self.from_cache or self.last_fetched is None:
+            return False
+        return dt_util.utcnow() - self.last_fetched < MIN_REFRESH_AGE
+
+    async def async_load_cache(self):
+        """Load the last good feed from the storage, if it is recent enough."""
+        try:
+            cache = await self._store.async_load()
+        except HomeAssistantError as err:
+            _LOGGER.warning("Failed loading the cached ANWS AOAWS feed: %s", err)
+            return False
+
+        if not cache:
+            return False
+        fetched = dt_util.parse_datetime(cache.get("fetched") or "")
+        if fetched is None or dt_util.utcnow() - fetched > CACHE_MAX_AGE:
+            return False
+
+        # Projected again, the cache may be older than the projection
+        try:
+            data = {
+                location: [project_record(j) for j in records]
+                for location, records in cache["data"].items()
+            }
+        except (KeyError, TypeError, AttributeError) as err:
+            _LOGGER.warning("Failed loading the cached ANWS AOAWS feed: %r", err)
+            return False
+
+        self.data = data
+        self._locations = frozenset(cache.get("locations") or self.data)
+        self.last_fetched = fetched
+        self.from_cache = True
+        self._datatimes = {
+            location: records[-1]["datatime"]
+            for location, records in self.data.items()
+            if records
+        }
+        return True
+
+    @callback
+    def _data_to_store(self):
+        """Return the feed to be stored."""
+        return {
+            "fetched": self.last_fetched.isoformat(),
+            "data": self.data,
+            "locations": sorted(self._locations),
+        }
+
+    @callback
+    def _wanted_sites(self):
+        """Return the locations to keep the records of, None for every one.
+
+        Every location is kept for an entry of all the airports, and while
+        there is no entry, e.g. in the config flow.
+        """
+        locations = {
+            entry.data[CONF_LOCATION_NAME]
+            for entry in self._hass.config_entries.async_entries(DOMAIN)
+        }
+        if not locations or ALL_SITES in locations:
+            return None
+        return locations
+
+    @callback
+    def async_skipped_site(self, site_name):
+        """Return if the records of a site were skipped from the feed.
+
+        The validators and the digest of the feed are then dropped, so the
+        next update parses the whole feed again.
+        """
+        if self.data is None or site_name in self.data or site_name not in self._locations:
+            return False
+        self._etag = self._last_modified = self._digest = None
+        return True
+
+    @classmethod
+    def _decode(cls, chunks, wanted):
+        """Parse and index a feed, keep the records of the wanted sites.
+
+        The chunks of the body are parsed one at a time and dropped from
+        the list once parsed, the groups of the other sites are not
+        decoded. Return the index with every location of the feed. Raise
+        ValueError for a body which is no airport list.
+        """
+        start = time.perf_counter()
+        parser = FeedParser(wanted)
+        chunks.reverse()
+        while chunks:
+            parser.feed(chunks.pop())
+        parser.close()
+        decoded = time.perf_counter()
+        try:
+            index = cls._index(parser.groups)
+        except (KeyError, TypeError, AttributeError) as err:
+            raise ValueError(f"Unexpected record in airport_list.Taiwan: {err!r}") from err
+        if wanted is not None:
+            index = {
+                location: records
+                for location, records in index.items()
+                if location in wanted
+            }
+        return FetchedFeed(
+            index,
+            frozenset(parser.locations),
+            (decoded - start) * 1000,
+            (time.perf_counter() - decoded) * 1000,
+        )
+
+    @staticmethod
+    def _index(data):
+        """Group the projected records by location_en in one pass, oldest record first."""
+        index = {}
+        for i in data:
+            for j in i:
+                j = project_record(j)
+                records = index.get(j["location_en"])
+                if records is None:
+                    index[j["location_en"]] = [j]
+                else:
+                    records.append(j)
+        for records in index.values():
+            if len(records) > 1:
+                records.sort(key=itemgetter("datatime"))
+        return index
+
+    @callback
+    def async_add_site(self, site_data):
+        """Register a site to be refreshed with the feed."""
+        self._sites.append(site_data)
+
+        @callback
+        def remove_site():
+            self._sites.remove(site_data)
+            self.scheduler.forget(site_data.site_name)
+
+        return remove_site
+
+    @callback
+    def async_next_update_interval(self):
+        """Return when the feed should be polled again."""
+        now = dt_util.utcnow()
+        retry_after = self.breaker.retry_after(now)
+        if retry_after is not None:
+            return max(retry_after, MIN_SCAN_INTERVAL)
+        return self.scheduler.next_interval(now)
+
+    @callback
+    def _async_observe_sites(self):
+        """Let the scheduler learn from the reports of the registered sites."""
+        now = dt_util.utcnow()
+        for site_data in self._sites:
+            records = self.data.get(site_data.site_name) if self.data else None
+            if not records:
+                continue
+            bad_weather = site_data.now is not None and site_data.now.condition in FAST_POLL_CONDITIONS
+            self.scheduler.observe(
+                site_data.site_name,
+                [parse_datatime(j["datatime"]) for j in records],
+                records[-1]["REPORT"].startswith("SPECI"),
+                bad_weather,
+                now,
+            )
+
+    async def async_update(self):
+        """Get the latest feed and refresh every registered site.
+
+        Return the digest of the feed with the staleness, so the coordinator
+        only notifies the entities when the feed or its staleness did change.
+        """
+        async with self._update_lock:
+            return await self._async_update()
+
+    async def _async_update(self):
+        self.stats.start_poll()
+        start = time.perf_counter()
+        received = await self._async_fetch()
+        self.stats.received(
+            time.perf_counter() - start,
+            received.size if received is not None else None,
+            self.transferred,
+        )
+        snapshots = None
+        if received is not None:
+            if received.digest != self._digest:
+                converted = await self._hass.async_add_executor_job(
+                    self._convert, received.feed.data, list(self._sites), self._datatimes
+                )
+                snapshots = self._async_set_feed(received.feed, converted)
+                self._digest = received.digest
+                if self.data:
+                    self._store.async_delay_save(self._data_to_store, CACHE_SAVE_DELAY)
+        elif self.data is None:
+            snapshots = dict.fromkeys(self._sites)
+
+        # Swap in the new snapshots on the event loop, with the feed they
+        # were converted from, so entities never see a half updated site
+        for site_data, snapshot in (snapshots or {}).items():
+            site_data.async_set_snapshot(snapshot)
+        if snapshots is not None:
+            self._async_observe_sites()
+        # The coordinator writes the entities once this returns, the poll
+        # ends after them, also when they were not notified
+        self._hass.loop.call_soon(self._async_end_poll)
+        return self._digest, self.stale
+
+    @callback
+    def _async_end_poll(self):
+        """Count the entities written in the poll and notify its end."""
+        self.stats.end_poll()
+        async_dispatcher_send(self._hass, SIGNAL_FEED_UPDATED)
+
+    async def _async_fetch(self):
+        """Download the airport list, retrying as long as the breaker allows."""
+        now = dt_util.utcnow()
+        if not self.breaker.allow(now):
+            _LOGGER.debug(
+                "Not fetching ANWS AOAWS for %s, serving the last feed",
+                self.breaker.retry_after(now),
+            )
+            return None
+
+        # The trial fetch of an open breaker is not retried
+        retries = 0 if self.breaker.is_open else FETCH_RETRIES
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1))
+            try:
+                received = await self._async_fetch_once()
+            except _RetryableError as err:
+                error = err
+                continue
+            except FetchError as err:
+                error = err
+                break
+            self.breaker.success()
+            return received
+
+        if self.breaker.failure(dt_util.utcnow()):
+            _LOGGER.warning(
+                "Failed fetching data from ANWS AOAWS %s times in a row, retrying in %s: %s",
+                self.breaker.failures,
+                self.breaker.retry_after(dt_util.utcnow()),
+                error,
+            )
+        else:
+            _LOGGER.error("Failed fetching data from ANWS AOAWS: %s", error)
+        return None
+
+    async def _async_fetch_once(self):
+        """Download the airport list, return None when it was not modified.
+
+        The body is hashed as it is received. Its chunks are parsed in the
+        executor only when its digest changed, decoding the records of the
+        configured sites.
+        """
+        headers = _request_headers()
+        if self.data is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+
+        try:
+            async with self._session.post(
+                self.uri,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                # Decompressed here, to count the bytes on the wire
+                auto_decompress=False,
+            ) as response:
+                if response.status == HTTPStatus.NOT_MODIFIED:
+                    self.last_fetched = dt_util.utcnow()
+                    self.from_cache = False
+                    return None
+                if response.status != HTTPStatus.OK:
+                    error = f"Received error {response.status}"
+                    if response.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                        raise _RetryableError(error)
+                    if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+                        raise _RetryableError(error)
+                    raise FetchError(error)
+                try:
+                    decompressor = StreamDecompressor(
+                        response.headers.get(aiohttp.hdrs.CONTENT_ENCODING)
+                    )
+                    digest = hashlib.sha1()
+                    transferred = size = 0
+                    chunks = []
+                    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                        transferred += len(chunk)
+                        chunks.append(decompressor.decompress(chunk))
+                        digest.update(chunks[-1])
+                        size += len(chunks[-1])
+                    chunks.append(decompressor.flush())
+                    digest.update(chunks[-1])
+                    size += len(chunks[-1])
+                    received = ReceivedFeed(None, digest.digest(), size)
+                    if received.digest != self._digest:
+                        # Parsed only now, an unchanged feed is not parsed again
+                        received = received._replace(
+                            feed=await self._hass.async_add_executor_job(
+                                self._decode, chunks, self._wanted_sites()
+                            )
+                        )
+                except ValueError as err:
+                    raise FetchError(str(err)) from err
+                self.transferred = transferred
+                self._etag = response.headers.get(aiohttp.hdrs.ETAG)
+                self._last_modified = response.headers.get(aiohttp.hdrs.LAST_MODIFIED)
+                self.last_fetched = dt_util.utcnow()
+                self.from_cache = False
+                return received
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise _RetryableError(repr(err)) from err
+
+    @staticmethod
+    def _convert(data, sites, last_datatimes):
+        """Convert the sites whose records changed in a decoded feed.
+
+        Runs in the executor and changes nothing of the feed, the result
+        is swapped in on the event loop by _async_set_feed.
+        """
+        datatimes = {
+            location: records[-1]["datatime"]
+            for location, records in data.items()
+        }
+        snapshots = {}
+        start = time.perf_counter()
+        for site_data in sites:
+            site = site_data.site_name
+            datatime = datatimes.get(site)
+            if datatime is None or datatime != last_datatimes.get(site):
+                snapshots[site_data] = site_data.build_snapshot(data)
+        return ConvertedFeed(snapshots, datatimes, (time.perf_counter() - start) * 1000)
+
+    @callback
+    def _async_set_feed(self, feed, converted):
+        """Swap in a decoded feed, return the snapshots converted from it."""
+        self.data = feed.data
+        self._locations = feed.locations
+        self._datatimes = converted.datatimes
+        self.stats.decode = feed.decode
+        self.stats.index = feed.index
+        self.stats.convert = converted.convert
+        self.stats.sites_converted = len(converted.snapshots)
+        return converted.snapshots
+
+
+class AnwsAoawseData:
+    """Get current AOAWS for one site from the shared ANWS feed."""
+
+    def __init__(self, hass, site_name, language, feed=None):
         """Initialize the data object."""
         self._hass = hass
         self._site = site_name
+        self._feed = feed if feed is not None else AnwsAoawsFeed(hass)
 
         # Holds the current data from the ANWS AOAWS
-        self.data = None
         self.site_name = None
         self.language = language
-        self.now = None
-        self.forecast = None
-        self.uri = BASE_URL
+        self.snapshot = None
+        self.history = ObservationHistory()
+        # Optional long-term SiteHistoryStore, the history above only holds two days
+        self.history_store = None
+        self._history_appends = set()
+
+        # Number of entity state writes skipped as nothing did change
+        self.suppressed_writes = 0
+
+    @property
+    def feed(self):
+        """Return the feed the site is read from."""
+        return self._feed
+
+    @property
+    def stale(self):
+        """Return if the observations may be outdated."""
+        return self._feed.stale
+
+    @property
+    def now(self):
+        """Return the current observation."""
+        return self.snapshot.now if self.snapshot else None
+
+    @property
+    def forecast(self):
+        """Return the rolling history of the observations of the site."""
+        return self.history if self.snapshot else None
+
+    @property
+    def data(self):
+        """Return the current records of the site, oldest first."""
+        return self._feed.data.get(self._site, []) if self._feed.data else []
 
     async def async_update_site(self):
-        """Async wrapper for getting the update."""
-        return await self._hass.async_add_executor_job(self._update_site)
+        """Look up the site in the feed, which is updated by its coordinator."""
+        return self._update_site()
 
     def get_observation_for_site(self, site, data):
         """ return observation """
-        return self._convert_to_observation(site, data)
+        return self.build_observations(data)[0]
 
     def get_observations_for_site(self, site, data):
         """ return observations """
-        return self._convert_to_observations(site, data)
-
-    def _convert_to_observation(self, site, data):
-        """ converter  """
-        observation = Observation()
-        for i in data:
-            for j in i:
-                if self._site == j["location_en"]:
-                    # date
-                    obs_datetime = datetime.strptime(
-                        j["datatime"].strip(), "%Y-%m-%dT%H:%M:%SZ") + timedelta(hours=8)
-                    timestamp = int(time.mktime((obs_datetime).timetuple()))
-
-                    observation.date = datetime.fromtimestamp(
-                        timestamp).strftime('%Y-%m-%d %H:%M:%S')
-
-                    # wether
-                    value = ''.join(c for c in j["WEATHER"]["EName"] if c.isalpha() or c.isspace()).strip()
-                    observation.weather = Element("W", value=value)
-
-                    # temperature
-                    value = int(j.get("TEMP", "0"))
-                    unit = UnitOfTemperature.CELSIUS
-                    temperature = value
-                    observation.temperature = Element("T", value=value, units=unit.strip())
-
-                    # wind speed
-                    value = int(j.get("WDSD", "0"))
-                    if "浬/時" in j["WDSD_UNIT"] or "KT" in j["WDSD_UNIT"]:
-                        value = value * 1.85
-                    unit = UnitOfSpeed.KILOMETERS_PER_HOUR
-                    observation.wind_speed = Element("W", value=value, units=unit)
-
-                    # wind direction
-                    value = int(j.get("WDIR", "0"))
-                    observation.wind_direction = Element("W", value=value)
-
-                    # visibility
-                    value = int(j.get("VIS", "0")) / 1000
-                    observation.visibility = Element("W", value=value, units=UnitOfLength.KILOMETERS)
-
-                    # cloud ceiling
-                    value = j.get("CEILING", "")
-                    observation.cloud_ceiling  = Element("W", value=value)
-
-                    for k in j.get("REPORT", "").split():
-                        if re.search(r"\d+\/\d+", k) and temperature == int(k.split("/")[0]):
-                            observation.dew_point = Element("T", value=k.split("/", 1)[1])
-                        if len(k) >= 1 and "Q" == k[0]:
-                            observation.pressure = Element("P", value=k[1:])
+        return self.build_observations(data)[1]
+
+    def build_observations(self, data):
+        """Convert the records of a site to the current and the past observations.
+
+        The derived fields are added in one pass over all of them.
+        """
+        if not data:
+            return Observation(), ()
+
+        now = self._convert_to_observation(data[-1])
+        forecast = self._convert_to_observations(data)
+        derive_observations(zip((now, *forecast), (data[-1], *data)))
+        return (
+            Observation(**now),
+            tuple([Observation(**fields) for fields in forecast]),
+        )
+
+    def _convert_to_observation(self, j):
+        """Convert the latest projected record to the fields of an Observation."""
+        observation = {}
+        # date
+        observation["date"] = parse_datatime(j["datatime"])
+
+        # wether
+        observation["weather"] = Element("W", value=j["WEATHER"])
+        observation["condition"] = resolve_condition(j["WEATHER"])
+
+        # temperature
+        value = _value(j, "TEMP", 0)
+        unit = UnitOfTemperature.CELSIUS
+        observation["temperature"] = Element("T", value=value, units=unit.strip())
+
+        # wind speed
+        value = _value(j, "WDSD", 0)
+        if "浬/時" in j["WDSD_UNIT"] or "KT" in j["WDSD_UNIT"]:
+            value = value * 1.85
+        unit = UnitOfSpeed.KILOMETERS_PER_HOUR
+        observation["wind_speed"] = Element("W", value=value, units=unit)
+
+        # wind direction
+        value = _value(j, "WDIR", 0)
+        observation["wind_direction"] = Element("W", value=value)
+
+        # visibility
+        value = _value(j, "VIS", 0) / 1000
+        observation["visibility"] = Element("W", value=value, units=UnitOfLength.KILOMETERS)
+        observation["visibility_class"] = classify_visibility(value)
+
+        # cloud ceiling
+        observation["cloud_ceiling"] = Element("W", value=j["CEILING"])
+
+        # dew point, pressure and wind gust from the METAR report
+        report = parse_report(j["REPORT"])
+        observation["report"] = report
+        if report.dew_point is not None:
+            observation["dew_point"] = Element(
+                "T", value=report.dew_point, units=UnitOfTemperature.CELSIUS)
+        if report.qnh is not None:
+            observation["pressure"] = Element(
+                "P", value=report.qnh, units=UnitOfPressure.HPA)
+        if report.wind_gust is not None:
+            observation["wind_gust"] = Element(
+                "W", value=report.wind_gust * 1.85, units=UnitOfSpeed.KILOMETERS_PER_HOUR)
 
         return observation
 
-    def _convert_to_observations(self, site, data):
-        """ converter  """
+    def _convert_to_observations(self, data):
+        """Convert the projected records to the fields of the past Observations."""
         observations = []
-        for i in data:
-            for j in i:
-                if self._site == j["location_en"]:
-                    observation = Observation()
-                    # date
-                    timestamp = int(time.mktime((datetime.strptime(
-                        j["datatime"].strip(), "%Y-%m-%dT%H:%M:%SZ") + timedelta(hours=8)).timetuple()))
-
-                    observation.date = datetime.fromtimestamp(
-                        timestamp).strftime('%Y-%m-%d %H:%M:%S')
-
-                    # wether
-                    value = ''.join(c for c in j["WEATHER"]["EName"] if c.isalpha() or c.isspace()).strip()
-                    observation.weather = Element("W", value=value)
-
-                    # temperature
-                    value = int(j.get("TEMP", "-1"))
-                    unit = UnitOfTemperature.CELSIUS
-                    temperature = value
-                    observation.temperature = Element("T", value=value, units=unit.strip())
-
-                    # wind speed
-                    value = int(j.get("WDSD", "-1"))
-                    if "浬/時" in j["WDSD_UNIT"] or "KT" in j["WDSD_UNIT"]:
-                        value = value * 1.85
-                    unit = UnitOfSpeed.KILOMETERS_PER_HOUR
-                    observation.wind_speed = Element("W", value=value, units=unit)
-
-                    # wind direction
-                    value = int(j.get("WDIR", "-1"))
-                    observation.wind_direction = Element("W", value=value)
-
-                    # visibility
-                    value = int(j.get("VIS", "-1"))
-                    observation.visibility = Element("W", value=value)
-
-                    # cloud ceiling
-                    value = j.get("CEILING", "")
-                    observation.cloud_ceiling  = Element("W", value=value)
-
-                    observations.append(observation)
+        for j in data:
+            observation = {}
+            # date
+            observation["date"] = parse_datatime(j["datatime"])
 
-        return observations
+            # wether
+            observation["weather"] = Element("W", value=j["WEATHER"])
+            observation["condition"] = resolve_condition(j["WEATHER"])
 
+            # temperature
+            value = _value(j, "TEMP", -1)
+            unit = UnitOfTemperature.CELSIUS
+            observation["temperature"] = Element("T", value=value, units=unit.strip())
 
-    def _parser_json(self, data):
-        if "airport_list" not in data:
-            _LOGGER.error(f"There is no airport_list")
-            return {}
-        if "Taiwan" not in data["airport_list"]:
-            _LOGGER.error(f"There is no Taiwan in airport_list")
-            return {}
-        new_data = []
-        #for i in data["airport_list"]["Taiwan"]:
-        #    datatime = i["datatime"]
-        #    location_en = i["location_en"]
+            # wind speed
+            value = _value(j, "WDSD", -1)
+            if "浬/時" in j["WDSD_UNIT"] or "KT" in j["WDSD_UNIT"]:
+                value = value * 1.85
+            unit = UnitOfSpeed.KILOMETERS_PER_HOUR
+            observation["wind_speed"] = Element("W", value=value, units=unit)
 
-        return data["airport_list"]["Taiwan"]
+            # wind direction
+            value = _value(j, "WDIR", -1)
+            observation["wind_direction"] = Element("W", value=value)
 
+            # visibility
+            value = _value(j, "VIS", -1)
+            observation["visibility"] = Element("W", value=value)
 
-    def _update_site(self):
-        """Return the nearest DataPoint Site to the held latitude/longitude."""
-
-        # Suppress the InsecureRequestWarning
-        requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
-        headers = {
-            'X-Requested-With': 'XMLHttpRequest',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'User-Agent': HA_USER_AGENT
-        }
+            # cloud ceiling
+            observation["cloud_ceiling"] = Element("W", value=j["CEILING"])
 
-        try:
-            response = requests.post(
-                self.uri,
-                headers=headers,
-                timeout=REQUEST_TIMEOUT,
-                verify=False)
+            observations.append(observation)
 
-        except requests.exceptions.RequestException:
-            _LOGGER.error("Failed fetching data for %s", self.site_name)
-            return
+        return observations
 
-        if response.status_code == HTTPStatus.OK:
-            try:
-                self.data = self._parser_json(response.json())
-                for i in self.data:
-                    for j in i:
-                        if self._site == j["location_en"]:
-                            self.site_name = self._site
-            except Exception as e:
-                _LOGGER.error(f"Received data error {e}")
+    def _update_site(self):
+        """Look up the configured site in the current feed."""
+        if self._site in self._feed.locations:
+            self.site_name = self._site
         else:
-            _LOGGER.error("Received error from ANWS AOAWS: %s", self.site_name)
             self.site_name = None
-            self.now = None
+            self.snapshot = None
 
         return self._site
 
-    async def async_update(self):
-        """Async wrapper for update method."""
-        return await self._hass.async_add_executor_job(self._update)
+    async def async_update_from_feed(self):
+        """Convert the current feed and swap in the new snapshot."""
+        self.async_set_snapshot(
+            await self._hass.async_add_executor_job(self.build_snapshot)
+        )
+
+    @callback
+    def async_set_snapshot(self, snapshot):
+        """Swap in a new snapshot and merge its observations into the history."""
+        if snapshot is self.snapshot:
+            return
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.history.merge(snapshot.forecast)
+            if self.history_store is not None and snapshot.now is not None:
+                # Only the current observation carries the fields of the METAR
+                self._async_append_history(snapshot.now)
+
+    @callback
+    def async_set_history_store(self, history_store):
+        """Keep the long-term history in a store, from the current observation on."""
+        self.history_store = history_store
+        if self.now is not None:
+            self._async_append_history(self.now)
+
+    @callback
+    def _async_append_history(self, observation):
+        """Append an observation to the history store in the executor."""
+        append = self._hass.async_add_executor_job(
+            self.history_store.append, (observation,)
+        )
+        self._history_appends.add(append)
+        append.add_done_callback(self._history_appended)
+
+    def _history_appended(self, append):
+        """Log an append to the history store which failed."""
+        self._history_appends.discard(append)
+        if not append.cancelled() and append.exception() is not None:
+            _LOGGER.error(
+                "Failed writing the ANWS AOAWS history of %s: %s",
+                self._site,
+                append.exception(),
+            )
+
+    async def async_close_history_store(self):
+        """Close the history store once the pending appends are done."""
+        if self.history_store is None:
+            return
+        if self._history_appends:
+            await asyncio.wait(set(self._history_appends))
+        self.history_store.close()
+        self.history_store = None
+
+    def build_snapshot(self, data=None):
+        """Convert the latest records of the site, of data or the current feed."""
+        if data is None:
+            data = self._feed.data
+        if data is None:
+            return None
 
-    def _update(self):
-        """Get the latest data from AOAWS."""
         if self.site_name is None:
             _LOGGER.error("No ANWS AOAWS observations site held, check logs for problems")
-            return
+            return self.snapshot
+
+        records = data.get(self._site)
+        if not records:
+            # Dropped from this feed, keep the last observations
+            _LOGGER.debug("No records of %s in the ANWS AOAWS feed", self._site)
+            return self.snapshot
 
         try:
-            self._update_site()
-            self.now = self.get_observation_for_site(
-                self._site, self.data
-            )
-            self.forecast = self.get_observations_for_site(
-                self._site, self.data
-            )
-        except (ValueError) as err:
-            _LOGGER.error("Check ANWS AOAWS connection: %s", err.args)
-            self.now = None
\ No newline at end of file
+            now, forecast = self.build_observations(records)
+            return SiteSnapshot(now=now, forecast=forecast)
+        except (KeyError, TypeError, ValueError, AttributeError) as err:
+            # A malformed record, keep the last observations
+            _LOGGER.error("Failed converting the ANWS AOAWS records of %s: %r", self._site, err)
+            return self.snapshot
@@ -0,0 +1,240 @@
+"""Decoder of the ANWS AOAWS airport list.
+
+orjson, which comes with Home Assistant, is used when it can be imported,
+json otherwise. Both return the same plain dicts, so the converters and
+the cache do not depend on the decoder.
+
+FeedParser walks airport_list.Taiwan one site group at a time, as the
+bytes are fed to it, and only decodes the groups of the wanted sites. The
+others are only scanned for their locations. project_record then keeps the
+fields of a record the converters use, as typed values.
+"""
+import json
+import re
+from functools import lru_cache
+
+# A string with the colon following a key, a bracket, or a string cut off
+_TOKEN = re.compile(rb'("(?:[^"\\]|\\.)*")(\s*:)?|[\[\]{}]|"')
+_NOT_SPACE = re.compile(rb"\S")
+_NEXT_GROUP = re.compile(rb"[^\s,]")
+_LOCATION = re.compile(rb'"location_en"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+# The keys leading to the site groups, from the top level object
+_TAIWAN = [None, b'"airport_list"', b'"Taiwan"']
+
+
+@lru_cache(maxsize=1)
+def _decoder():
+    """Return the decoder, loaded on first use."""
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def backend():
+    """Return the name of the decoder which is used."""
+    return _decoder().__module__.split(".")[0]
+
+
+def decode_feed(body):
+    """Decode a raw get_metar_data response into dicts.
+
+    Raise ValueError when the body is no valid JSON.
+    """
+    return _decoder()(body)
+
+
+def project_record(record):
+    """Return the fields of a record which are used, converted once.
+
+    The numbers become int, None when they are blank or no number, and
+    WEATHER its English phrase. A record which was projected is projected
+    the same, so the records of the cached feed can be projected again.
+    Raise KeyError for a record without location_en or datatime.
+    """
+    weather = record.get("WEATHER")
+    if isinstance(weather, dict):
+        weather = weather.get("EName")
+    return {
+        "location_en": record["location_en"],
+        "datatime": record["datatime"],
+        "TEMP": _number(record.get("TEMP")),
+        "WDSD": _number(record.get("WDSD")),
+        "WDSD_UNIT": _text(record.get("WDSD_UNIT")),
+        "WDIR": _number(record.get("WDIR")),
+        "VIS": _number(record.get("VIS")),
+        "CEILING": _text(record.get("CEILING")).strip(),
+        "WEATHER": "".join(
+            c for c in _text(weather) if c.isalpha() or c.isspace()
+        ).strip(),
+        "REPORT": _text(record.get("REPORT")),
+    }
+
+
+def _number(value):
+    """Return a number of the feed as int, None when it is blank or no number."""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    """Return a text of the feed as str, empty when it is missing."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+class FeedParser:
+    """Incremental parser of a get_metar_data response.
+
+    The body is fed in chunks. Every site group of airport_list.Taiwan is
+    decoded as soon as its last byte was fed, when it holds a wanted
+    location, wanted None keeping every group. Only the group being read
+    is buffered, the groups may hold nested arrays.
+    """
+
+    def __init__(self, wanted=None):
+        """Initialize the parser."""
+        self._wanted = wanted
+        self._buffer = b""
+        # Where the scan goes on in the buffer
+        self._pos = 0
+        # The keys of the containers open on the way to airport_list.Taiwan
+        self._path = []
+        self._key = None
+        self._in_taiwan = False
+        # The start and the depth of the group being read
+        self._group = None
+        self._depth = 0
+        self.done = False
+
+        self.groups = []
+        self.locations = set()
+
+    def feed(self, chunk):
+        """Parse the next bytes of the body.
+
+        Raise ValueError for a body which is no airport list.
+        """
+        if self.done or not chunk:
+            return
+        keep = self._pos if self._group is None else self._group
+        self._buffer = self._buffer[keep:] + chunk
+        self._pos -= keep
+        if self._group is not None:
+            self._group = 0
+        self._parse(False)
+
+    def close(self):
+        """Parse what is left, raise ValueError when the site groups are cut off."""
+        if not self.done:
+            self._parse(True)
+        if not self.done:
+            if not self._in_taiwan:
+                raise ValueError("There is no airport_list.Taiwan")
+            raise ValueError("airport_list.Taiwan is cut off")
+        self._buffer = b""
+
+    def _parse(self, final):
+        if not self._in_taiwan and not self._find_taiwan(final):
+            return
+        while not self.done:
+            if self._group is None:
+                match = _NEXT_GROUP.search(self._buffer, self._pos)
+                if match is None:
+                    self._pos = len(self._buffer)
+                    return
+                if match.group() == b"]":
+                    self.done = True
+                    return
+                if match.group() != b"[":
+                    raise ValueError("Unexpected data in airport_list.Taiwan")
+                self._group = self._pos = match.start()
+                self._depth = 0
+            end = self._group_end(final)
+            if end is None:
+                return
+            self._add_group(self._buffer[self._group:end])
+            self._group = None
+            self._pos = end
+
+    def _find_taiwan(self, final):
+        """Scan up to the site groups, return if they were reached."""
+        for match in _TOKEN.finditer(self._buffer, self._pos):
+            token = match.group()
+            cut_off = token == b'"'
+            if not cut_off and token[:1] == b'"' and match.group(2) is None:
+                # A key may have its colon in the next chunk
+                cut_off = _NOT_SPACE.search(self._buffer, match.end()) is None
+            if cut_off:
+                # A string, or the colon after it, comes with the next chunk
+                if final:
+                    raise ValueError("The airport list is cut off")
+                self._pos = match.start()
+                return False
+            if token[:1] == b'"':
+                self._key = match.group(1) if match.group(2) else None
+            elif token in (b"[", b"{"):
+                self._path.append(self._key)
+                self._key = None
+                if token == b"[" and self._path == _TAIWAN:
+                    self._in_taiwan = True
+                    self._pos = match.end()
+                    return True
+            else:
+                if not self._path:
+                    raise ValueError("Unbalanced airport list")
+                self._path.pop()
+                self._key = None
+        self._pos = len(self._buffer)
+        return False
+
+    def _group_end(self, final):
+        """Scan the group being read, return its end once it is complete."""
+        if self._pos == self._group:
+            end = self._buffer.find(b"]", self._group)
+            while end != -1:
+                escaped = self._buffer.find(b"\\", self._group, end) != -1
+                if escaped or self._buffer.count(b"[", self._group + 1, end):
+                    # An escaped quote or a nested array, follow every token
+                    break
+                if self._buffer.count(b'"', self._group, end) % 2 == 0:
+                    # Out of the strings, and no array was opened in the group
+                    return end + 1
+                end = self._buffer.find(b"]", end + 1)
+            else:
+                if not final:
+                    return None
+
+        for match in _TOKEN.finditer(self._buffer, self._pos):
+            token = match.group()
+            if token == b'"':
+                # A string cut off, it ends in the next chunk
+                if final:
+                    raise ValueError("A site group is cut off")
+                self._pos = match.start()
+                return None
+            if token in (b"[", b"{"):
+                self._depth += 1
+            elif token in (b"]", b"}"):
+                self._depth -= 1
+                if not self._depth:
+                    return match.end()
+        self._pos = len(self._buffer)
+        return None
+
+    def _add_group(self, group):
+        """Note the locations of a group, decode it when one of them is wanted."""
+        names = {
+            json.loads(name) if b"\\" in name else name[1:-1].decode()
+            for name in set(_LOCATION.findall(group))
+        }
+        self.locations |= names
+        if self._wanted is None or not names.isdisjoint(self._wanted):
+            self.groups.append(decode_feed(group))
@@ -0,0 +1,67 @@
+"""Meteorological fields derived from the converted observations.
+
+They are computed by AnwsAoawseData once per snapshot, in one pass over
+its observations, so the entities only read them.
+"""
+import math
+import re
+
+from .const import CLOUD_COVER_PERCENT
+
+METERS_PER_STATUTE_MILE = 1609.344
+
+# Magnus coefficients over water, Alduchov and Eskridge (1996)
+MAGNUS_A = 17.625
+MAGNUS_B = 243.04  # °C
+
+_CLEAR_SKY = re.compile(r"(?<!\S)(?:NSC|SKC|CLR|NCD|CAVOK)(?!\S)")
+
+
+def _vapour_pressure(temperature):
+    """Return the saturation vapour pressure in hPa at a temperature in °C."""
+    return 6.1094 * math.exp(MAGNUS_A * temperature / (MAGNUS_B + temperature))
+
+
+def relative_humidity(temperature, dew_point):
+    """Return the relative humidity in % from the temperature and dew point in °C."""
+    humidity = 100 * _vapour_pressure(dew_point) / _vapour_pressure(temperature)
+    return round(min(humidity, 100.0), 1)
+
+
+def apparent_temperature(temperature, dew_point, wind_speed):
+    """Return the apparent temperature in °C, the wind speed is in km/h.
+
+    The formula of Steadman used by the Australian Bureau of Meteorology,
+    for shade: humidity warms, wind cools.
+    """
+    wind = wind_speed / 3.6
+    return round(temperature + 0.33 * _vapour_pressure(dew_point) - 0.70 * wind - 4.00, 1)
+
+
+def cloud_coverage(report, text):
+    """Return the cloud coverage in % of the most covering layer of a METAR.
+
+    None when the report holds no cloud group.
+    """
+    if report.clouds:
+        return max(CLOUD_COVER_PERCENT.get(layer.cover, 0) for layer in report.clouds)
+    if report.cavok or _CLEAR_SKY.search(text):
+        return 0
+    return None
+
+
+def flight_category(ceiling, visibility):
+    """Return VFR, MVFR, IFR or LIFR for a ceiling in ft and a visibility in m.
+
+    A ceiling of None is no ceiling. The bounds are the ones of the FAA.
+    """
+    if ceiling is None:
+        ceiling = math.inf
+    miles = visibility / METERS_PER_STATUTE_MILE
+    if ceiling < 500 or miles < 1:
+        return "LIFR"
+    if ceiling < 1000 or miles < 3:
+        return "IFR"
+    if ceiling <= 3000 or miles <= 5:
+        return "MVFR"
+    return "VFR"
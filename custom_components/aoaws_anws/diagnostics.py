@@ -0,0 +1,40 @@
+"""Diagnostics support for the Taiwan ANWS integration."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import site_hass_datas
+from .const import ANWS_AOAWS_DATA, DOMAIN
+from .data import format_date
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Return the diagnostics of a config entry."""
+    sites = site_hass_datas(hass.data[DOMAIN][config_entry.entry_id])
+    feed = sites[0][ANWS_AOAWS_DATA].feed
+
+    return {
+        "entry": {
+            "title": config_entry.title,
+            "data": dict(config_entry.data),
+            "options": dict(config_entry.options),
+        },
+        "feed": {
+            "uri": feed.uri,
+            "last_fetched": format_date(feed.last_fetched),
+            "from_cache": feed.from_cache,
+            "stale": feed.stale,
+            "locations": sorted(feed.locations),
+            "next_update_interval": feed.async_next_update_interval().total_seconds(),
+            "stats": feed.stats.as_dict(),
+        },
+        "sites": {
+            anws_aoaws_data.site_name: {
+                "observed": format_date(anws_aoaws_data.now.date)
+                if anws_aoaws_data.now
+                else None,
+                "history": len(anws_aoaws_data.history),
+                "suppressed_writes": anws_aoaws_data.suppressed_writes,
+            }
+            for anws_aoaws_data in (site[ANWS_AOAWS_DATA] for site in sites)
+        },
+    }
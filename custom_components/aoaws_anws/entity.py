@@ -0,0 +1,27 @@
+"""Common behaviour of the Taiwan ANWS entities."""
+from homeassistant.core import callback
+
+
+class AnwsAoawsEntity:
+    """Mixin which only writes the state when it did change.
+
+    The entity has to hold the data object of its site as ``_data``.
+    """
+
+    _last_written_state = None
+
+    def _state_signature(self):
+        """Return what is written to the state machine."""
+        return (self.available, self.state, self.state_attributes, self.extra_state_attributes)
+
+    @callback
+    def async_write_ha_state_if_changed(self) -> None:
+        """Write the state, unless it is the same as the last one written."""
+        signature = self._state_signature()
+        if signature == self._last_written_state:
+            self._data.suppressed_writes += 1
+            return
+
+        self._last_written_state = signature
+        self._data.feed.stats.written()
+        self.async_write_ha_state()
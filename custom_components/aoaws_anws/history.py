@@ -0,0 +1,95 @@
+"""Rolling observation history of an ANWS AOAWS site."""
+from .const import HISTORY_CAPACITY, HISTORY_MAX_AGE
+
+
+class ObservationHistory:
+    """A bounded ring buffer of the observations of a site.
+
+    The observations are kept ordered by date, oldest first, and every
+    date is only kept once. The buffer is allocated once, so the memory
+    used does not grow with the polls.
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY, max_age=HISTORY_MAX_AGE):
+        """Initialize the history."""
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._max_age = max_age
+        self._start = 0
+        self._count = 0
+        self._dates = set()
+        # Increased on every change, so derived data can be cached against it
+        self.version = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate over the observations, oldest first, without a copy."""
+        for offset in range(self._count):
+            yield self._slots[(self._start + offset) % self._capacity]
+
+    @property
+    def latest(self):
+        """Return the newest observation."""
+        if not self._count:
+            return None
+        return self._slots[(self._start + self._count - 1) % self._capacity]
+
+    def merge(self, observations):
+        """Merge time ordered observations, return if the history changed."""
+        changed = False
+        for observation in observations:
+            if observation.date is None or observation.date in self._dates:
+                continue
+            latest = self.latest
+            if latest is None or observation.date > latest.date:
+                self._append(observation)
+            elif self._kept(observation, latest):
+                self._insert(observation)
+            else:
+                continue
+            changed = True
+
+        if changed:
+            self._expire()
+            self.version += 1
+        return changed
+
+    def _append(self, observation):
+        if self._count == self._capacity:
+            self._pop_oldest()
+        self._slots[(self._start + self._count) % self._capacity] = observation
+        self._dates.add(observation.date)
+        self._count += 1
+
+    def _kept(self, observation, latest):
+        """Return if an observation older than the newest one would be kept.
+
+        It is dropped again when it is too old, or older than every
+        observation of a full buffer.
+        """
+        if observation.date < latest.date - self._max_age:
+            return False
+        return self._count < self._capacity or observation.date > self._slots[self._start].date
+
+    def _insert(self, observation):
+        """Insert an observation older than the newest one, which is rare."""
+        observations = sorted([*self, observation], key=lambda item: item.date)
+        observations = observations[-self._capacity:]
+        self._slots = observations + [None] * (self._capacity - len(observations))
+        self._start = 0
+        self._count = len(observations)
+        self._dates = {item.date for item in observations}
+
+    def _pop_oldest(self):
+        self._dates.discard(self._slots[self._start].date)
+        self._slots[self._start] = None
+        self._start = (self._start + 1) % self._capacity
+        self._count -= 1
+
+    def _expire(self):
+        """Drop the observations older than the maximum age."""
+        oldest_allowed = self.latest.date - self._max_age
+        while self._count and self._slots[self._start].date < oldest_allowed:
+            self._pop_oldest()
@@ -0,0 +1,200 @@
+"""Memory-mapped long-term history of the observations of a site.
+
+Every observation is one fixed-width record of 32-bit integers, appended
+to one file per site. The file is memory-mapped and cast to integers, so
+a column is a strided view over the records, and time ranges are found
+by bisecting the time column. Neither copies any data.
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+MAGIC = 0x414E5753  # "ANWS"
+VERSION = 1
+
+# The columns of a record, with the factor the values are stored with
+FIELDS = (
+    "time",  # minutes since the epoch
+    "temperature",
+    "dew_point",
+    "pressure",
+    "visibility",
+    "wind_direction",
+    "wind_speed",
+    "wind_gust",
+)
+FIELD_SCALES = {
+    "time": 1,
+    "temperature": 10,
+    "dew_point": 10,
+    "pressure": 10,
+    "visibility": 1000,
+    "wind_direction": 1,
+    "wind_speed": 10,
+    "wind_gust": 10,
+}
+MISSING = -(2**31)
+
+_HEADER = struct.Struct("=4i")
+_RECORD = struct.Struct(f"={len(FIELDS)}i")
+_COLUMNS = len(FIELDS)
+
+
+def to_minutes(value):
+    """Return a datetime as minutes since the epoch."""
+    return int(value.timestamp()) // 60
+
+
+def from_minutes(value):
+    """Return minutes since the epoch as an UTC datetime."""
+    return datetime.fromtimestamp(value * 60, timezone.utc)
+
+
+def _scaled(element, field):
+    value = element.value if element is not None else None
+    if value is None or value == "":
+        return MISSING
+    try:
+        return round(float(value) * FIELD_SCALES[field])
+    except ValueError:
+        return MISSING
+
+
+def observation_record(observation):
+    """Return the record of an observation."""
+    return (
+        to_minutes(observation.date),
+        *(_scaled(getattr(observation, field), field) for field in FIELDS[1:]),
+    )
+
+
+class SiteHistoryStore:
+    """An append-only, memory-mapped history file of a site.
+
+    The methods do file I/O and have to run in the executor.
+    """
+
+    def __init__(self, path):
+        """Initialize the store, creating the file when needed."""
+        self.path = path
+        self._map = None
+        self._size = 0
+        self._last_time = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+            with open(path, "wb") as history_file:
+                history_file.write(_HEADER.pack(MAGIC, VERSION, _COLUMNS, 0))
+        else:
+            with open(path, "rb") as history_file:
+                magic, version, columns, _ = _HEADER.unpack(history_file.read(_HEADER.size))
+            if (magic, version, columns) != (MAGIC, VERSION, _COLUMNS):
+                raise ValueError(f"{path} is not an ANWS AOAWS history file")
+
+        times = self.column("time")
+        if len(times):
+            self._last_time = times[-1]
+
+    def __len__(self):
+        return len(self._records()) // _COLUMNS
+
+    def _records(self):
+        """Return all the records as one flat integer view of the map."""
+        size = os.path.getsize(self.path)
+        if size != self._size or self._map is None:
+            # Views handed out keep the former map alive until they are released
+            self._map = None
+            self._size = size
+            if size > _HEADER.size:
+                with open(self.path, "rb") as history_file:
+                    self._map = mmap.mmap(history_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map is None:
+            return memoryview(b"").cast("i")
+
+        # Ignore a record which was only written partly
+        end = _HEADER.size + (self._size - _HEADER.size) // _RECORD.size * _RECORD.size
+        return memoryview(self._map)[_HEADER.size:end].cast("i")
+
+    def append(self, observations):
+        """Append the observations newer than the last stored one."""
+        records = bytearray()
+        for observation in observations:
+            if observation.date is None:
+                continue
+            record = observation_record(observation)
+            if self._last_time is not None and record[0] <= self._last_time:
+                continue
+            records += _RECORD.pack(*record)
+            self._last_time = record[0]
+
+        if records:
+            with open(self.path, "ab") as history_file:
+                size = history_file.seek(0, os.SEEK_END)
+                partial = (size - _HEADER.size) % _RECORD.size
+                if partial:
+                    # Drop a record which was only written partly, or the
+                    # new records would be read shifted
+                    history_file.truncate(size - partial)
+                history_file.write(records)
+        return len(records) // _RECORD.size
+
+    def column(self, field, start=None, end=None):
+        """Return a zero-copy view of a column, optionally for a time range.
+
+        The values are stored multiplied by FIELD_SCALES and MISSING marks
+        a value which was not reported.
+        """
+        records = self._records()
+        times = records[0::_COLUMNS]
+        first = 0 if start is None else bisect_left(times, to_minutes(start))
+        last = len(times) if end is None else bisect_right(times, to_minutes(end))
+        index = FIELDS.index(field)
+        return records[first * _COLUMNS + index:last * _COLUMNS:_COLUMNS]
+
+    def rows(self, start=None, end=None):
+        """Return a zero-copy view of the records of a time range, as rows."""
+        records = self._records()
+        times = records[0::_COLUMNS]
+        first = 0 if start is None else bisect_left(times, to_minutes(start))
+        last = len(times) if end is None else bisect_right(times, to_minutes(end))
+        return records[first * _COLUMNS:last * _COLUMNS]
+
+    def compact(self, keep_after=None):
+        """Rewrite the file ordered by time, without duplicates or partial records.
+
+        Records older than keep_after are dropped. Return the number of
+        records kept.
+        """
+        records = self._records()
+        rows = {}
+        for offset in range(0, len(records), _COLUMNS):
+            row = records[offset:offset + _COLUMNS]
+            rows[row[0]] = row.tobytes()
+        records.release()
+
+        cutoff = None if keep_after is None else to_minutes(keep_after)
+        data = array("i")
+        data.frombytes(_HEADER.pack(MAGIC, VERSION, _COLUMNS, 0))
+        kept = 0
+        for time in sorted(rows):
+            if cutoff is not None and time < cutoff:
+                continue
+            data.frombytes(rows[time])
+            kept += 1
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as history_file:
+            data.tofile(history_file)
+        os.replace(temp_path, self.path)
+
+        self._map = None
+        self._size = 0
+        self._last_time = max(rows) if kept else None
+        return kept
+
+    def close(self):
+        """Release the map of the file."""
+        self._map = None
@@ -0,0 +1,204 @@
+"""Parser for the METAR REPORT of the ANWS AOAWS feed."""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+KNOTS_PER_MPS = 1.94384
+KNOTS_PER_KMH = 0.539957
+HPA_PER_INHG = 33.8639
+
+CEILING_COVERS = ("BKN", "OVC", "VV")
+
+_WEATHER = (
+    r"(?:(?:[-+]|VC)?(?:MI|PR|BC|DR|BL|SH|TS|FZ)?"
+    r"(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)+"
+    r"|VC(?:SH|TS)|TS|//)"
+)
+
+# The groups of a METAR come in a fixed order, so the whole report is
+# tokenized by one anchored match. The repeated groups are captured as a
+# whole and split afterwards with findall, the possessive quantifiers keep
+# the engine from backtracking into them. A group whose values were not
+# observed, sent as slashes, is matched and left out.
+_REPORT = (
+    r"""
+    \s*(?:(?:METAR|SPECI)\s+)?(?:(?:COR|AUTO)\s+)*
+    (?:[A-Z]{4}\s+)?(?:\d{6}Z\s+)?(?:(?:COR|AUTO|NIL)\s+)*
+    (?:(?P<wdir>\d{3}|VRB)(?P<wspd>P?\d{2,3})(?:G(?P<gust>P?\d{2,3}))?(?P<wunit>KT|MPS|KMH)\s+
+    |/{3}(?:/{2}|\d{2})(?:KT|MPS|KMH)\s+)?
+    (?:(?P<wvfrom>\d{3})V(?P<wvto>\d{3})\s+)?
+    (?:(?P<cavok>CAVOK)\s+|(?P<vis>\d{4})(?:NDV)?\s+(?:\d{4}(?:N|NE|E|SE|S|SW|W|NW)\s+)?|////\s+)?
+    (?P<rvr>(?:R\d{2}[LCR]?/\S+\s+)*+)
+    (?P<wx>(?:""" + _WEATHER + r"""\s+)*+)
+    (?P<clouds>(?:(?:FEW|SCT|BKN|OVC|VV|///)(?:\d{3}|///)(?:CB|TCU|///)?\s+|(?:NSC|SKC|CLR|NCD)\s+)*+)
+    (?:(?P<t>M?\d{2})/(?P<td>M?\d{2}|//)?\s+|/////\s+)?
+    (?:Q(?P<hpa>\d{4})|A(?P<inhg>\d{4}))?
+    """
+)
+_RVR = r"R(\d{2}[LCR]?)/([PM]?\d{4})(?:V([PM]?\d{4}))?(?:FT)?/?([UDN])?"
+_CLOUD = r"(FEW|SCT|BKN|OVC|VV)(\d{3}|///)(CB|TCU|///)?"
+
+# Fallbacks for reports with groups out of order, trend and remarks excluded
+_BODY_END = r"\s(?:RMK|NOSIG|BECMG|TEMPO)\b"
+_TEMPERATURE = r"(?<!\S)(M?\d{2})/(M?\d{2}|//)?(?!\S)"
+_QNH = r"(?<!\S)(?:Q(\d{4})|A(\d{4}))(?!\S)"
+
+
+@lru_cache(maxsize=1)
+def _patterns():
+    """Compile the patterns on the first report, which keeps the import fast."""
+    return (
+        re.compile(_REPORT, re.VERBOSE),
+        re.compile(_RVR),
+        re.compile(_CLOUD),
+        re.compile(_BODY_END),
+        re.compile(_TEMPERATURE),
+        re.compile(_QNH),
+    )
+
+
+class CloudLayer(NamedTuple):
+    """A cloud layer, the height is in feet."""
+
+    cover: str
+    height: int | None
+    type: str | None = None
+
+
+class RunwayVisualRange(NamedTuple):
+    """A runway visual range, the ranges are in the units of the report."""
+
+    runway: str
+    low: str
+    high: str | None = None
+    trend: str | None = None
+
+
+class MetarReport(NamedTuple):
+    """The structured fields of a METAR report.
+
+    Wind speeds are in knots, the visibility is in meters and the QNH
+    is in hPa.
+    """
+
+    temperature: int | None = None
+    dew_point: int | None = None
+    qnh: float | None = None
+    wind_direction: int | None = None
+    wind_speed: float | None = None
+    wind_gust: float | None = None
+    wind_variable: tuple[int, int] | None = None
+    visibility: int | None = None
+    cavok: bool = False
+    clouds: tuple[CloudLayer, ...] = ()
+    ceiling: int | None = None
+    weather: tuple[str, ...] = ()
+    rvr: tuple[RunwayVisualRange, ...] = ()
+
+
+_EMPTY = MetarReport()
+
+# Temperatures are two digits with an M for minus, so they are looked up
+_TEMPERATURES = {f"{value:02d}": value for value in range(100)}
+_TEMPERATURES.update({f"M{value:02d}": -value for value in range(100)})
+# Cloud heights are in hundreds of feet, /// is not observed
+_HEIGHTS = {f"{value:03d}": value * 100 for value in range(1000)}
+_CLOUD_TYPES = {"CB": "CB", "TCU": "TCU"}
+
+
+def _speed(value, unit):
+    speed = int(value[1:] if value[0] == "P" else value)
+    if unit == "MPS":
+        return round(speed * KNOTS_PER_MPS, 1)
+    if unit == "KMH":
+        return round(speed * KNOTS_PER_KMH, 1)
+    return speed
+
+
+# The groups below take few distinct values, shared by the sites and kept
+# from one poll to the next, so their parsing is cached
+@lru_cache(maxsize=256)
+def _runway_ranges(rvr):
+    return tuple([
+        RunwayVisualRange(runway, low, high or None, trend or None)
+        for runway, low, high, trend in _patterns()[1].findall(rvr)
+    ])
+
+
+@lru_cache(maxsize=256)
+def _weather(wx):
+    return tuple([group for group in wx.split() if group != "//"])
+
+
+@lru_cache(maxsize=256)
+def _clouds(clouds):
+    """Return the cloud layers and the ceiling of a group of clouds."""
+    layers = tuple([
+        CloudLayer(cover, _HEIGHTS.get(height), _CLOUD_TYPES.get(ctype))
+        for cover, height, ctype in _patterns()[2].findall(clouds)
+    ])
+    for cover, height, _ in layers:
+        if height is not None and cover in CEILING_COVERS:
+            return layers, height
+    return layers, None
+
+
+def parse_report(report):
+    """Parse a METAR report into a MetarReport."""
+    if not report:
+        return _EMPTY
+
+    report_re, _, _, body_end_re, temperature_re, qnh_re = _patterns()
+    report = report.rstrip("= \n") + " "
+    wdir, wspd, gust, wunit, wvfrom, wvto, cavok, vis, rvr, wx, clouds, t, td, hpa, inhg = (
+        report_re.match(report).groups()
+    )
+
+    wind_direction = wind_speed = wind_gust = wind_variable = visibility = None
+    if wunit:
+        if wdir != "VRB":
+            wind_direction = int(wdir)
+        if wunit == "KT" and wspd[0] != "P":
+            wind_speed = int(wspd)
+        else:
+            wind_speed = _speed(wspd, wunit)
+        if gust:
+            wind_gust = _speed(gust, wunit)
+    if wvfrom:
+        wind_variable = (int(wvfrom), int(wvto))
+    if cavok:
+        visibility = 9999
+    elif vis:
+        visibility = int(vis)
+
+    layers, ceiling = _clouds(clouds) if clouds else ((), None)
+
+    if t is None or (hpa is None and inhg is None):
+        body = body_end_re.split(report, 1)[0]
+        if t is None and (match := temperature_re.search(body)):
+            t, td = match.groups()
+        if hpa is None and inhg is None and (match := qnh_re.search(body)):
+            hpa, inhg = match.groups()
+
+    qnh = None
+    if hpa:
+        qnh = float(hpa)
+    elif inhg:
+        qnh = round(int(inhg) / 100 * HPA_PER_INHG, 1)
+
+    return MetarReport(
+        _TEMPERATURES.get(t),
+        _TEMPERATURES.get(td),
+        qnh,
+        wind_direction,
+        wind_speed,
+        wind_gust,
+        wind_variable,
+        visibility,
+        bool(cavok),
+        layers,
+        ceiling,
+        _weather(wx) if wx else (),
+        _runway_ranges(rvr) if rvr else (),
+    )
@@ -0,0 +1,74 @@
+"""Fetch policy of the ANWS AOAWS feed: retries and a circuit breaker."""
+import random
+from datetime import timedelta
+
+from .const import (
+    BREAKER_COOLDOWN,
+    BREAKER_MAX_COOLDOWN,
+    BREAKER_THRESHOLD,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Return the seconds to wait before a retry, with full jitter.
+
+    The delay grows exponentially with the attempt, starting at 0, and is
+    drawn at random below it so retries of many clients spread out.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Stop fetching for a while after failed polls in a row.
+
+    Once open, a single trial fetch is allowed after the cooldown. The
+    cooldown doubles every time the trial fails too.
+    """
+
+    def __init__(
+        self,
+        threshold=BREAKER_THRESHOLD,
+        cooldown=BREAKER_COOLDOWN,
+        max_cooldown=BREAKER_MAX_COOLDOWN,
+    ):
+        """Initialize the breaker, closed."""
+        self._threshold = threshold
+        self._base_cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._cooldown = cooldown
+        self.failures = 0
+        self.open_until = None
+
+    @property
+    def is_open(self):
+        """Return if the breaker did trip."""
+        return self.open_until is not None
+
+    def allow(self, now):
+        """Return if a fetch may be done now."""
+        return self.open_until is None or now >= self.open_until
+
+    def retry_after(self, now):
+        """Return the time until the trial fetch, None when closed."""
+        if self.open_until is None:
+            return None
+        return max(self.open_until - now, timedelta())
+
+    def success(self):
+        """Close the breaker after a fetch did succeed."""
+        self.failures = 0
+        self.open_until = None
+        self._cooldown = self._base_cooldown
+
+    def failure(self, now):
+        """Count a failed poll, return True when the breaker trips."""
+        self.failures += 1
+        if self.open_until is not None:
+            # The trial fetch failed, wait longer
+            self._cooldown = min(self._cooldown * 2, self._max_cooldown)
+        elif self.failures < self._threshold:
+            return False
+        self.open_until = now + self._cooldown * random.uniform(0.9, 1.1)
+        return True
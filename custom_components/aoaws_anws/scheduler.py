@@ -0,0 +1,151 @@
+"""Polling scheduler following the METAR issuance of the ANWS AOAWS sites."""
+import random
+from collections import Counter, deque
+from datetime import timedelta
+
+from .const import (
+    BAD_WEATHER_FAST_LIMIT,
+    DEFAULT_PUBLISH_LAG,
+    DEFAULT_SCAN_INTERVAL,
+    DENSE_SCAN_INTERVAL,
+    DENSE_WINDOW,
+    FAST_MODE_DURATION,
+    FAST_SCAN_INTERVAL,
+    MAX_SCAN_INTERVAL,
+    METAR_CYCLE,
+    MIN_SCAN_INTERVAL,
+    POLL_PHASE_SPREAD,
+)
+
+# Issuance times further off the cycle than this are taken as SPECIs
+CYCLE_TOLERANCE = timedelta(minutes=2)
+
+
+def random_delay(spread, draw=random.random):
+    """Return a delay drawn evenly from zero up to spread.
+
+    Spreads the requests of installations started or polling together,
+    e.g. the first live fetch after a start from the cache.
+    """
+    return spread * draw()
+
+
+class SiteCycle:
+    """The learned issuance pattern of a site."""
+
+    def __init__(self):
+        """Initialize the cycle."""
+        self.latest = None
+        self.routine = None
+        self.cycle = METAR_CYCLE
+        self.lags = deque(maxlen=8)
+        # Since when the site reports bad weather
+        self.bad_weather_since = None
+
+    @property
+    def lag(self):
+        """Return the delay between a report and its publication in the feed.
+
+        The shortest delay seen is the closest to the real one, as the
+        reports are only seen when the feed is polled.
+        """
+        return min(self.lags) if self.lags else DEFAULT_PUBLISH_LAG
+
+    def learn_cycle(self, datatimes):
+        """Learn the routine interval from the time ordered report times."""
+        intervals = Counter(
+            round((later - earlier).total_seconds() / 60)
+            for earlier, later in zip(datatimes, datatimes[1:])
+        )
+        # The most common interval of at least a quarter hour is the routine one
+        intervals = [
+            (count, minutes) for minutes, count in intervals.items() if minutes >= 15
+        ]
+        if intervals:
+            self.cycle = timedelta(minutes=max(intervals)[1])
+
+    def is_routine(self, datatime):
+        """Return if a report time is on the routine cycle of the site."""
+        if self.routine is None:
+            return True
+        offset = (datatime - self.routine) % self.cycle
+        return offset <= CYCLE_TOLERANCE or self.cycle - offset <= CYCLE_TOLERANCE
+
+
+class IssuanceScheduler:
+    """Decide when the feed should be polled next.
+
+    The feed is polled densely once the next routine report of a site is
+    expected, and left alone between the cycles. SPECIs and bad weather
+    switch to a fast mode for a while, bad weather only in its first
+    hours.
+
+    The expected reports are polled for after a phase drawn at random once,
+    so installations do not all poll ANWS AOAWS at the same second.
+    """
+
+    def __init__(self, phase=None):
+        """Initialize the scheduler, with a random phase unless one is given."""
+        self._sites = {}
+        self._fast_until = None
+        if phase is None:
+            phase = random_delay(POLL_PHASE_SPREAD)
+        self.phase = phase
+
+    def observe(self, site, datatimes, speci, bad_weather, now):
+        """Learn from the time ordered report times of a site in the feed."""
+        if not datatimes:
+            return
+
+        cycle = self._sites.get(site)
+        if cycle is None:
+            cycle = self._sites[site] = SiteCycle()
+
+        latest = datatimes[-1]
+        if latest != cycle.latest:
+            if cycle.latest is not None:
+                cycle.lags.append(max(now - latest, timedelta()))
+            cycle.learn_cycle(datatimes)
+            if speci or not cycle.is_routine(latest):
+                self._fast_until = now + FAST_MODE_DURATION
+            else:
+                cycle.routine = latest
+            cycle.latest = latest
+
+        if bad_weather:
+            if cycle.bad_weather_since is None:
+                cycle.bad_weather_since = now
+            # Only the start of bad weather is polled for fast, SPECIs
+            # still switch to the fast mode while it lasts
+            if now - cycle.bad_weather_since < BAD_WEATHER_FAST_LIMIT:
+                self._fast_until = now + FAST_MODE_DURATION
+        else:
+            cycle.bad_weather_since = None
+
+    def forget(self, site):
+        """Stop scheduling for a site."""
+        self._sites.pop(site, None)
+
+    def next_interval(self, now):
+        """Return the time until the feed should be polled again."""
+        if self._fast_until is not None and now < self._fast_until:
+            return FAST_SCAN_INTERVAL
+
+        interval = None
+        for cycle in self._sites.values():
+            if cycle.routine is None:
+                continue
+            expected = cycle.routine + cycle.cycle + cycle.lag + self.phase
+            if expected <= now:
+                if now - expected <= DENSE_WINDOW:
+                    return DENSE_SCAN_INTERVAL
+                # The report is late, fall back to the regular polling
+                candidate = DEFAULT_SCAN_INTERVAL
+            else:
+                candidate = expected - now
+            if interval is None or candidate < interval:
+                interval = candidate
+
+        if interval is None:
+            return DEFAULT_SCAN_INTERVAL
+        return max(MIN_SCAN_INTERVAL, min(interval, MAX_SCAN_INTERVAL))
@@ -1,23 +1,32 @@
 """Support for Taiwan ANWS weather service."""
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import ATTR_ATTRIBUTION
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import ATTR_ATTRIBUTION, EntityCategory
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.typing import ConfigType
 
-from . import device_info
+from . import device_info, feed_device_info, site_hass_datas
+from .entity import AnwsAoawsEntity
+from .data import format_date
 from .const import (
     ATTRIBUTION,
     ATTR_LAST_UPDATE,
     ATTR_SENSOR_ID,
     ATTR_SITE_NAME,
+    ATTR_STALE,
     ATTR_WEATHER_TEXT,
-    CONDITION_CLASSES,
     DOMAIN,
     ANWS_AOAWS_COORDINATOR,
     ANWS_AOAWS_DATA,
+    ANWS_AOAWS_FEED,
     ANWS_AOAWS_NAME,
+    ANWS_AOAWS_SITE,
+    ANWS_AOAWS_STATS_ADDERS,
+    ANWS_AOAWS_STATS_ENTRY,
+    SIGNAL_FEED_UPDATED,
+    SIGNAL_NEW_SITE,
     SENSOR_TYPES,
-    VISIBILITY_CLASSES
+    STATS_SENSOR_TYPES,
 )
 
 
@@ -27,16 +36,58 @@ async def async_setup_entry(
     """Set up the Taiwan ANWS weather sensor platform."""
     hass_data = hass.data[DOMAIN][entry.entry_id]
 
-    async_add_entities(
+    @callback
+    def async_add_site(site_hass_data):
+        async_add_entities(
+            [
+                AnwsAoawsCurrentSensor(entry, site_hass_data, sensor_type)
+                for sensor_type in SENSOR_TYPES
+            ],
+            False,
+        )
+
+    for site_hass_data in site_hass_datas(hass_data):
+        async_add_site(site_hass_data)
+
+    # The stats are the ones of the shared feed, one entry holds them and
+    # hands them on to another entry when it is unloaded
+    feed_hass_data = hass.data[DOMAIN][ANWS_AOAWS_FEED]
+    stats_adders = feed_hass_data.setdefault(ANWS_AOAWS_STATS_ADDERS, {})
+    stats_adders[entry.entry_id] = async_add_entities
+    if ANWS_AOAWS_STATS_ENTRY not in feed_hass_data:
+        _async_add_stats_sensors(feed_hass_data, entry.entry_id)
+
+    @callback
+    def async_release_stats():
+        stats_adders.pop(entry.entry_id, None)
+        if feed_hass_data.get(ANWS_AOAWS_STATS_ENTRY) == entry.entry_id:
+            # The sensors of the entry were removed with its platform
+            feed_hass_data.pop(ANWS_AOAWS_STATS_ENTRY)
+            if stats_adders:
+                _async_add_stats_sensors(feed_hass_data, next(iter(stats_adders)))
+
+    entry.async_on_unload(async_release_stats)
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_SITE.format(entry.entry_id), async_add_site
+        )
+    )
+
+
+@callback
+def _async_add_stats_sensors(feed_hass_data, entry_id):
+    """Add the stats sensors of the shared feed with the platform of an entry."""
+    feed_hass_data[ANWS_AOAWS_STATS_ENTRY] = entry_id
+    feed_hass_data[ANWS_AOAWS_STATS_ADDERS][entry_id](
         [
-            AnwsAoawsCurrentSensor(entry, hass_data, sensor_type)
-            for sensor_type in SENSOR_TYPES
+            AnwsAoawsStatsSensor(feed_hass_data[ANWS_AOAWS_DATA], stat)
+            for stat in STATS_SENSOR_TYPES
         ],
         False,
     )
 
 
-class AnwsAoawsCurrentSensor(SensorEntity):
+class AnwsAoawsCurrentSensor(AnwsAoawsEntity, SensorEntity):
     """Implementation of a Taiwan ANWS current weather condition sensor."""
 
     def __init__(self, config_entry, hass_data, sensor_type):
@@ -47,7 +98,9 @@ class AnwsAoawsCurrentSensor(SensorEntity):
         self._type = sensor_type
         self._name = f"{hass_data[ANWS_AOAWS_NAME]} {SENSOR_TYPES[self._type][0]}"
         self._unique_id = f"{SENSOR_TYPES[self._type][0]}_{self._data.site_name}"
-        self._attr_device_info = device_info(config_entry)
+        self._attr_device_info = device_info(
+            config_entry, hass_data.get(ANWS_AOAWS_SITE)
+        )
 
         self.anws_aoaws_site_id = None
         self.anws_aoaws_site_name = None
@@ -67,24 +120,18 @@ class AnwsAoawsCurrentSensor(SensorEntity):
     def state(self):
         """Return the state of the sensor."""
         value = None
-        if self._type == "visibility_distance" and hasattr(
-            self.anws_aoaws_now, "visibility"
-        ):
-            value = self.anws_aoaws_now.visibility.value
+        now = self.anws_aoaws_now
+        if self._type == "visibility_distance" and now and now.visibility:
+            value = now.visibility.value
 
         if self._type == "visibility" and hasattr(self.anws_aoaws_now, "visibility"):
-            _visibility = self.anws_aoaws_now.visibility.value
-            value = "Very Poor"
-            for k, v in VISIBILITY_CLASSES.items():
-                if _visibility <= v:
-                    value = k
-                    break
+            value = self.anws_aoaws_now.visibility_class
+
+        elif self._type == "flight_category" and self.anws_aoaws_now:
+            value = self.anws_aoaws_now.flight_category
 
         elif self._type == "weather" and hasattr(self.anws_aoaws_now, self._type):
-            for k, v in CONDITION_CLASSES.items():
-                if self.anws_aoaws_now.weather.value.lower().strip() in v:
-                    return k
-            return None
+            return self.anws_aoaws_now.condition
 
         elif hasattr(self.anws_aoaws_now, self._type):
             value = getattr(self.anws_aoaws_now, self._type)
@@ -123,11 +170,12 @@ class AnwsAoawsCurrentSensor(SensorEntity):
         """Return the state attributes of the device."""
         attr =  {
             ATTR_ATTRIBUTION: ATTRIBUTION,
-            ATTR_LAST_UPDATE: self.anws_aoaws_now.date if self.anws_aoaws_now else None,
+            ATTR_LAST_UPDATE: format_date(self.anws_aoaws_now.date) if self.anws_aoaws_now else None,
             ATTR_SENSOR_ID: self._type,
             ATTR_SITE_NAME: self.anws_aoaws_site_name if self.anws_aoaws_site_name else None,
+            ATTR_STALE: self._data.stale,
         }
-        if self._type == "weather":
+        if self._type == "weather" and self.anws_aoaws_now and self.anws_aoaws_now.weather:
             attr[ATTR_WEATHER_TEXT] = self.anws_aoaws_now.weather.text
 
         return attr
@@ -140,7 +188,11 @@ class AnwsAoawsCurrentSensor(SensorEntity):
         self._update_callback()
 
     async def async_update(self):
-        """Schedule a custom update via the common entity update service."""
+        """Schedule a custom update via the common entity update service.
+
+        The requests of all the entities are coalesced by the shared
+        coordinator, and the feed is not fetched again while it is fresh.
+        """
         await self._coordinator.async_request_refresh()
 
     @callback
@@ -148,7 +200,7 @@ class AnwsAoawsCurrentSensor(SensorEntity):
         """Load data from integration."""
         self.anws_aoaws_site_name = self._data.site_name
         self.anws_aoaws_now = self._data.now
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     @property
     def should_poll(self) -> bool:
@@ -164,3 +216,39 @@ class AnwsAoawsCurrentSensor(SensorEntity):
     def available(self):
         """Return if state is available."""
         return self.anws_aoaws_now is not None
+
+
+class AnwsAoawsStatsSensor(SensorEntity):
+    """Diagnostic sensor of a timing or count of the last poll of the feed."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, feed, stat):
+        """Initialize the sensor."""
+        self._feed = feed
+        self._stat = stat
+
+        name, device_class, unit, icon = STATS_SENSOR_TYPES[stat]
+        self._attr_name = f"ANWS AOAWS {name}"
+        self._attr_unique_id = f"{DOMAIN}_{stat}"
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        self._attr_device_info = feed_device_info()
+
+    @property
+    def native_value(self):
+        """Return the value of the last poll."""
+        value = getattr(self._feed.stats, self._stat)
+        return round(value, 2) if isinstance(value, float) else value
+
+    async def async_added_to_hass(self) -> None:
+        """Write the stats at the end of every poll, also of an unchanged feed."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIGNAL_FEED_UPDATED, self.async_write_ha_state
+            )
+        )
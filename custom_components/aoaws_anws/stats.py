@@ -0,0 +1,60 @@
+"""Per-stage timings of the polls of the ANWS AOAWS feed."""
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class FeedStats:
+    """Durations and counts of the last poll of the feed.
+
+    The durations are in milliseconds. The stages which did not run in
+    the last poll, e.g. decoding a not modified feed, keep their former
+    duration.
+    """
+
+    fetch: float | None = None
+    decode: float | None = None
+    index: float | None = None
+    convert: float | None = None
+    bytes_received: int = 0
+    bytes_transferred: int = 0
+    sites_converted: int = 0
+    entities_written: int = 0
+    polls: int = 0
+    total_bytes: int = 0
+    total_transferred: int = 0
+
+    # Written while the entities of the current poll are being updated
+    _writing: int = 0
+
+    def start_poll(self):
+        """Start counting a new poll."""
+        self.polls += 1
+        self._writing = 0
+
+    def end_poll(self):
+        """End the poll, once its entities were written."""
+        self.entities_written = self._writing
+
+    def received(self, fetch, size, transferred):
+        """Record a response, size is None when nothing new was received.
+
+        size counts the decompressed body, transferred the body as it came
+        over the wire.
+        """
+        self.fetch = fetch * 1000
+        self.bytes_received = size if size is not None else 0
+        self.bytes_transferred = transferred if size is not None else 0
+        self.total_bytes += self.bytes_received
+        self.total_transferred += self.bytes_transferred
+
+    def written(self):
+        """Count an entity state written."""
+        self._writing += 1
+
+    def as_dict(self):
+        """Return the stats for the diagnostics."""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if not name.startswith("_")
+        }
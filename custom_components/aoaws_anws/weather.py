@@ -18,18 +18,22 @@ from homeassistant.components.weather import (
     WeatherEntityFeature
 )
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.const import UnitOfTemperature, UnitOfSpeed
 
-from . import device_info
+from . import device_info, site_hass_datas
+from .entity import AnwsAoawsEntity
 from .const import (
+    ATTR_STALE,
     ATTRIBUTION,
-    CONDITION_CLASSES,
     DEFAULT_NAME,
     DOMAIN,
     ANWS_AOAWS_COORDINATOR,
     ANWS_AOAWS_DATA,
     ANWS_AOAWS_NAME,
+    ANWS_AOAWS_SITE,
+    SIGNAL_NEW_SITE,
 )
 
 
@@ -40,19 +44,29 @@ async def async_setup_entry(
     hass_data = hass.data[DOMAIN][config_entry.entry_id]
     weather_coordinator = hass_data[ANWS_AOAWS_COORDINATOR]
 
-    async_add_entities(
-        [
-            AnwsAoawsWeather(
-                config_entry,
-                hass_data,
-                weather_coordinator
-            )
-        ],
-        False,
+    @callback
+    def async_add_site(site_hass_data):
+        async_add_entities(
+            [
+                AnwsAoawsWeather(
+                    config_entry,
+                    site_hass_data,
+                    weather_coordinator
+                )
+            ],
+            False,
+        )
+
+    for site_hass_data in site_hass_datas(hass_data):
+        async_add_site(site_hass_data)
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_SITE.format(config_entry.entry_id), async_add_site
+        )
     )
 
 
-class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
+class AnwsAoawsWeather(AnwsAoawsEntity, SingleCoordinatorWeatherEntity):
     """Implementation of a Anws Aoaws weather condition."""
     _attr_supported_features = WeatherEntityFeature.FORECAST_HOURLY
 
@@ -64,11 +78,15 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
 
         self._name = f"{DEFAULT_NAME} {hass_data[ANWS_AOAWS_NAME]}"
         self._unique_id = f"{self._data.site_name}"
-        self._attr_device_info = device_info(config_entry)
+        self._attr_device_info = device_info(
+            config_entry, hass_data.get(ANWS_AOAWS_SITE)
+        )
 
         self.anws_aoaws_now = None
         self.anws_aoaws_forecast = None
         self.forecast_type = "hourly"
+        self._forecast_payload = None
+        self._forecast_version = None
 
     @property
     def name(self):
@@ -83,10 +101,7 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
     @property
     def condition(self):
         """Return the current condition."""
-        for k, v in CONDITION_CLASSES.items():
-            if self.anws_aoaws_now.weather.value.lower().strip() in v:
-                return k
-        return None
+        return self.anws_aoaws_now.condition if self.anws_aoaws_now else None
 
     @property
     def cloud_coverage(self) -> float | None:
@@ -101,8 +116,8 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
     def native_apparent_temperature(self) -> float | None:
         """Return the apparent temperature."""
         return (
-            self.anws_aoaws_now.temperature.value
-            if self.anws_aoaws_now and self.anws_aoaws_now.temperature
+            self.anws_aoaws_now.apparent_temperature.value
+            if self.anws_aoaws_now and self.anws_aoaws_now.apparent_temperature
             else None
         )
 
@@ -146,8 +161,8 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
     def native_wind_gust_speed(self) -> float | None:
         """Return the wind gust speed."""
         return (
-            self.anws_aoaws_now.wind_speed.value
-            if self.anws_aoaws_now and self.anws_aoaws_now.wind_speed
+            self.anws_aoaws_now.wind_gust.value
+            if self.anws_aoaws_now and self.anws_aoaws_now.wind_gust
             else None
         )
 
@@ -174,6 +189,11 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
         """Return the attribution."""
         return ATTRIBUTION
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes of the device."""
+        return {ATTR_STALE: self._data.stale}
+
     async def async_added_to_hass(self) -> None:
         """Set up a listener and load data."""
         self.async_on_remove(
@@ -186,8 +206,17 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
         """Load data from integration."""
         self.anws_aoaws_now = self._data.now
         self.anws_aoaws_forecast = self._data.forecast
-        self._attr_temperature_unit = self.anws_aoaws_now.temperature.units if self.anws_aoaws_now.temperature else UnitOfTemperature.CELSIUS
-        self._attr_wind_speed_unit = self.anws_aoaws_now.wind_speed.units if self.anws_aoaws_now.wind_speed else UnitOfSpeed.KILOMETERS_PER_HOUR
+        self._update_forecast_payload()
+        self._attr_temperature_unit = (
+            self.anws_aoaws_now.temperature.units
+            if self.anws_aoaws_now and self.anws_aoaws_now.temperature
+            else UnitOfTemperature.CELSIUS
+        )
+        self._attr_wind_speed_unit = (
+            self.anws_aoaws_now.wind_speed.units
+            if self.anws_aoaws_now and self.anws_aoaws_now.wind_speed
+            else UnitOfSpeed.KILOMETERS_PER_HOUR
+        )
         self._attr_temperature = (
             self.anws_aoaws_now.temperature.value
             if self.anws_aoaws_now and self.anws_aoaws_now.temperature
@@ -219,7 +248,7 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
             else None
         )
 
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     @property
     def should_poll(self) -> bool:
@@ -232,20 +261,36 @@ class AnwsAoawsWeather(SingleCoordinatorWeatherEntity):
         return self.anws_aoaws_now is not None
 
     @callback
-    def _async_forecast_hourly(self) -> list[Forecast] | None:
-        """Return the hourly forecast in native units."""
+    def _update_forecast_payload(self) -> None:
+        """Rebuild the forecast when the history changed, notify the subscribers."""
+        version = (
+            self.anws_aoaws_forecast.version if self.anws_aoaws_forecast else None
+        )
+        if version == self._forecast_version:
+            return
+        self._forecast_version = version
 
+        forecast_data: list[Forecast] | None = None
         if self.anws_aoaws_forecast:
-            forecast_data: list[Forecast] = []
-            for item in self.anws_aoaws_forecast:
-                forecast_data.append(
-                    {
-                        ATTR_FORECAST_TIME: item.date,
-                        ATTR_FORECAST_NATIVE_TEMP: item.temperature.value,
-                        ATTR_FORECAST_NATIVE_WIND_SPEED: item.wind_speed.value,
-                        ATTR_FORECAST_CONDITION: item.weather.value,
-                        ATTR_FORECAST_WIND_BEARING: item.wind_direction.value
-                    }
-                )
-            return forecast_data
-        return None
\ No newline at end of file
+            forecast_data = [
+                {
+                    ATTR_FORECAST_TIME: item.date.isoformat(),
+                    ATTR_FORECAST_NATIVE_TEMP: item.temperature.value,
+                    ATTR_FORECAST_NATIVE_WIND_SPEED: item.wind_speed.value,
+                    ATTR_FORECAST_CONDITION: item.condition,
+                    ATTR_FORECAST_WIND_BEARING: item.wind_direction.value
+                }
+                for item in self.anws_aoaws_forecast
+            ]
+        if forecast_data == self._forecast_payload:
+            return
+        self._forecast_payload = forecast_data
+        if self.hass is not None:
+            self.hass.async_create_task(
+                self.async_update_listeners((self.forecast_type,))
+            )
+
+    @callback
+    def _async_forecast_hourly(self) -> list[Forecast] | None:
+        """Return the hourly forecast in native units, built once per change."""
+        return self._forecast_payload